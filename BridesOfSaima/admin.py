@@ -1,19 +1,40 @@
 from django.contrib import admin
-from .models import Customer, Invoice, InvoiceItem, Bride, BrideImage
+from django.db.models import Count
+from django.utils import timezone
+from .models import Customer, Invoice, InvoiceItem, Bride, BrideImage, MonthlyRevenueRollup, Job, InvoiceSequence
+from . import search
 
 # Register your models here.
 
+class FullTextSearchMixin:
+    """
+    Answer the changelist search box from the FTS5 index (see search.py)
+    instead of LIKE '%term%' scans; search_fields only turns the box on
+    """
+    
+    def get_search_condition(self, search_term):
+        return search.match(self.model, search_term)
+    
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return queryset.filter(self.get_search_condition(search_term)), False
+
 @admin.register(Customer)
-class CustomerAdmin(admin.ModelAdmin):
+class CustomerAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ('name', 'email', 'phone', 'created_at')
     search_fields = ('name', 'email', 'phone')
     list_filter = ('created_at',)
 
 @admin.register(Invoice)
-class InvoiceAdmin(admin.ModelAdmin):
-    list_display = ('invoice_number', 'customer', 'payment_status', 'created_at')
+class InvoiceAdmin(FullTextSearchMixin, admin.ModelAdmin):
+    list_display = ('invoice_number', 'customer', 'payment_status', 'total', 'due_amount', 'created_at')
     list_filter = ('payment_status', 'created_at')
     search_fields = ('customer__name', 'invoice_number')
+    
+    def get_search_condition(self, search_term):
+        # Invoices also match on their customer, as with the customer__name search field
+        return search.match(Invoice, search_term) | search.match(Customer, search_term, field='customer')
 
 @admin.register(InvoiceItem)
 class InvoiceItemAdmin(admin.ModelAdmin):
@@ -28,7 +49,7 @@ class BrideImageInline(admin.TabularInline):
     verbose_name_plural = "Additional Images"
 
 @admin.register(Bride)
-class BrideAdmin(admin.ModelAdmin):
+class BrideAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ('name', 'location', 'event_date', 'get_total_images_count', 'created_at')
     list_filter = ('event_date', 'location', 'created_at', 'is_featured')
     search_fields = ('name', 'location', 'tagline')
@@ -49,6 +70,9 @@ class BrideAdmin(admin.ModelAdmin):
         })
     )
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(additional_images_count=Count('additional_images'))
+    
     def get_total_images_count(self, obj):
         return obj.get_total_images_count()
     get_total_images_count.short_description = 'Total Images'
@@ -59,3 +83,27 @@ class BrideImageAdmin(admin.ModelAdmin):
     list_filter = ('created_at', 'bride__location')
     search_fields = ('bride__name', 'caption')
     ordering = ('bride', 'order', 'created_at')
+
+@admin.register(MonthlyRevenueRollup)
+class MonthlyRevenueRollupAdmin(admin.ModelAdmin):
+    list_display = ('year', 'month', 'bookings', 'revenue', 'advance', 'due', 'paid_count', 'pending_count', 'updated_at')
+    list_filter = ('year',)
+    readonly_fields = [field.name for field in MonthlyRevenueRollup._meta.fields]
+
+@admin.register(InvoiceSequence)
+class InvoiceSequenceAdmin(admin.ModelAdmin):
+    list_display = ('year', 'last_number')
+    readonly_fields = ('year',)
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'task', 'status', 'attempts', 'max_attempts', 'run_after', 'created_at', 'finished_at')
+    list_filter = ('status', 'task')
+    search_fields = ('task', 'last_error')
+    readonly_fields = ('task', 'payload', 'attempts', 'last_error', 'started_at', 'finished_at', 'created_at', 'updated_at')
+    actions = ['retry_jobs']
+    
+    @admin.action(description='Retry selected jobs')
+    def retry_jobs(self, request, queryset):
+        count = queryset.exclude(status='running').update(status='pending', attempts=0, run_after=timezone.now())
+        self.message_user(request, f'{count} job(s) queued for retry.')
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class BridesofsaimaConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'BridesOfSaima'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from . import signals, tasks  # noqa: F401
+        from .database import configure_sqlite
+
+        connection_created.connect(configure_sqlite)
@@ -0,0 +1,162 @@
+"""
+Cached responses for the public pages (homepage, gallery, bride detail).
+
+Pages rendered for anonymous visitors are kept in the ``pages`` cache, whose
+backend is chosen with PAGE_CACHE_BACKEND in settings. Every cached page
+records the brides it shows and when its rendering started. Saving or
+deleting a Bride or BrideImage stamps that bride with the time (see
+signals.py), and a page rendered before the stamp of any of its brides is
+treated as a miss. Each stamp is its own key, written with a plain set(), so
+concurrent requests cannot lose one. Adding, removing or re-dating a bride
+changes the gallery order instead, which retires every gallery page at once
+by bumping the version in their keys.
+"""
+import hashlib
+import logging
+import time
+from functools import wraps
+
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+PAGE_CACHE = 'pages'
+
+# Views wrapped with cache_public_page, reported by get_stats()
+CACHED_VIEWS = ('homepage', 'brides_gallery', 'brides_feed', 'bride_detail', 'bride_images')
+
+
+def get_page_cache():
+    return caches[PAGE_CACHE]
+
+
+def gallery_version():
+    """Version component of the gallery page keys"""
+    cache = get_page_cache()
+    version = cache.get('gallery:version')
+    if version is None:
+        cache.add('gallery:version', time.time_ns(), None)
+        version = cache.get('gallery:version')
+    return version
+
+
+def homepage_key(request):
+    return 'page:homepage'
+
+
+def gallery_key(request):
+    return f'page:gallery:{gallery_version()}'
+
+
+def feed_key(request):
+    cursor = hashlib.sha1(request.GET.get('cursor', '').encode()).hexdigest()
+    return f'page:feed:{gallery_version()}:{cursor}'
+
+
+def bride_key(request, pk):
+    return f'page:bride:{pk}'
+
+
+def bride_images_key(request, pk):
+    return f'page:bride:{pk}:images'
+
+
+def count(view_name, outcome):
+    """Increment the hit or miss counter of a cached view"""
+    cache = get_page_cache()
+    key = f'stats:{view_name}:{outcome}'
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass  # Evicted between add() and incr(); losing one count is fine
+
+
+def get_stats():
+    """Hit/miss counters of every cached view"""
+    cache = get_page_cache()
+    keys = [f'stats:{view}:{outcome}' for view in CACHED_VIEWS for outcome in ('hits', 'misses')]
+    values = cache.get_many(keys)
+    stats = {}
+    for view in CACHED_VIEWS:
+        hits = values.get(f'stats:{view}:hits', 0)
+        misses = values.get(f'stats:{view}:misses', 0)
+        total = hits + misses
+        stats[view] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / total, 3) if total else None,
+        }
+    return stats
+
+
+def bride_version_key(pk):
+    return f'bride:{pk}:version'
+
+
+def store_page(key, response, started):
+    """Cache a response rendered at `started` with the brides listed in response.bride_ids"""
+    cache = get_page_cache()
+    bride_ids = list(getattr(response, 'bride_ids', ()))
+    for pk in bride_ids:
+        # Brides never invalidated yet: any page is current
+        cache.add(bride_version_key(pk), 0, None)
+    cache.set(key, (started, bride_ids, response))
+
+
+def is_current(started, bride_ids):
+    """Whether a page rendered at `started` predates no change to its brides"""
+    cache = get_page_cache()
+    keys = [bride_version_key(pk) for pk in bride_ids]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Evicted: the last change is unknown, so restart the clock and re-render
+            cache.add(key, time.time_ns(), None)
+            return False
+    return all(version < started for version in versions.values())
+
+
+def invalidate_bride(pk):
+    """Retire every cached page showing the given bride"""
+    get_page_cache().set(bride_version_key(pk), time.time_ns(), None)
+    logger.debug(f"Invalidated cached pages of bride {pk}")
+
+
+def invalidate_gallery():
+    """Retire every cached gallery page, e.g. when the gallery order changes"""
+    get_page_cache().set('gallery:version', time.time_ns(), None)
+
+
+def cache_public_page(key_func):
+    """
+    Serve a view from the page cache for anonymous GET requests.
+    `key_func(request, *args, **kwargs)` names the cache entry; the view sets
+    `response.bride_ids` to the brides on the page so edits can invalidate it.
+    Staff and other logged-in users always get a fresh, personalised page.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET' or request.user.is_authenticated:
+                return view(request, *args, **kwargs)
+
+            key = key_func(request, *args, **kwargs)
+            cached = get_page_cache().get(key)
+            if cached is not None:
+                started, bride_ids, response = cached
+                if is_current(started, bride_ids):
+                    count(view.__name__, 'hits')
+                    return response
+
+            count(view.__name__, 'misses')
+            # Taken before the view reads the database, so a change committed
+            # while it renders retires the page it produces
+            started = time.time_ns()
+            response = view(request, *args, **kwargs)
+            # Responses setting cookies (e.g. a CSRF token) are never shared
+            if response.status_code == 200 and not response.cookies:
+                store_page(key, response, started)
+            return response
+        return wrapper
+    return decorator
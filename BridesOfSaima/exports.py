@@ -0,0 +1,209 @@
+"""
+Streamed exports of invoices for staff.
+
+Spreadsheet exports write one row per line item (plus one for invoices
+without items) with the invoice's stored totals. Invoices are read with
+``iterator(chunk_size=...)`` and their items prefetched per chunk, so only
+one chunk is ever held in memory. CSV is streamed row by row; XLSX is
+written to a temporary file in XlsxWriter's constant-memory mode first.
+
+For the PDF archive, PDFs are rendered (or read from the PDF cache, see
+pdf.py) one after the other while the invoices are iterated in chunks. The
+export_invoice_pdfs command can hand them to a pool of worker processes
+instead, copying them into the archive in completion order; web requests
+never fork. The archive is written to an unseekable buffer that is drained
+after every chunk, and only a few invoices are in flight at once, so memory
+use does not grow with the number of invoices exported.
+"""
+import csv
+import logging
+import os
+import tempfile
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime, time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+# Invoices fetched (and line items prefetched) per query
+INVOICE_CHUNK_SIZE = 500
+
+SPREADSHEET_COLUMNS = [
+    'Invoice Number', 'Issue Date', 'Due Date', 'Payment Status',
+    'Customer', 'Email', 'Phone',
+    'Item', 'Quantity', 'Unit Price', 'Line Total',
+    'Subtotal', 'Discount %', 'Discount', 'Tax %', 'Tax', 'Total', 'Advance', 'Due',
+]
+
+
+class Echo:
+    """File-like object for csv.writer that returns each row instead of storing it"""
+
+    def write(self, value):
+        return value
+
+
+def invoice_rows(invoices):
+    """Spreadsheet rows for `invoices`, one per line item"""
+    invoices = invoices.select_related('customer').prefetch_related('items')
+    for invoice in invoices.iterator(chunk_size=INVOICE_CHUNK_SIZE):
+        totals = [
+            invoice.subtotal, invoice.discount_percentage, invoice.discount_amount,
+            invoice.tax_percentage, invoice.tax_amount, invoice.total, invoice.advance_amount, invoice.due_amount,
+        ]
+        head = [
+            invoice.invoice_number, invoice.issue_date, invoice.due_date, invoice.get_payment_status_display(),
+            invoice.customer.name, invoice.customer.email or '', invoice.customer.phone or '',
+        ]
+        items = invoice.items.all()
+        for item in items:
+            yield head + [item.description, item.quantity, item.unit_price, item.get_total()] + totals
+        if not items:
+            yield head + ['', '', '', ''] + totals
+
+
+def stream_invoice_csv(invoices):
+    """Yield the CSV export of `invoices` line by line"""
+    writer = csv.writer(Echo())
+    yield writer.writerow(SPREADSHEET_COLUMNS)
+    for row in invoice_rows(invoices):
+        yield writer.writerow(row)
+
+
+def write_invoice_xlsx(invoices):
+    """
+    Write the XLSX export of `invoices` to a temporary file and return it,
+    rewound. Rows are flushed to disk as they are written.
+    """
+    import xlsxwriter
+
+    output = tempfile.TemporaryFile()
+    workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+    sheet = workbook.add_worksheet('Invoices')
+    bold = workbook.add_format({'bold': True})
+    date_format = workbook.add_format({'num_format': 'yyyy-mm-dd'})
+    money_format = workbook.add_format({'num_format': '#,##0.00'})
+    # Column formats by position: dates, then the monetary columns
+    formats = {1: date_format, 2: date_format, 9: money_format, 10: money_format}
+    formats.update({column: money_format for column in range(11, len(SPREADSHEET_COLUMNS))})
+
+    sheet.write_row(0, 0, SPREADSHEET_COLUMNS, bold)
+    for row_number, row in enumerate(invoice_rows(invoices), start=1):
+        for column, value in enumerate(row):
+            if column in (1, 2):
+                sheet.write_datetime(row_number, column, datetime.combine(value, time()), formats[column])
+            elif column in formats and value != '':
+                sheet.write_number(row_number, column, float(value), formats[column])
+            else:
+                sheet.write(row_number, column, value)
+    sheet.freeze_panes(1, 0)
+    workbook.close()
+
+    output.seek(0)
+    return output
+
+
+class ZipStream:
+    """Write-only file object for zipfile whose contents are collected with pop()"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def get_export_workers():
+    """Worker processes used by export_invoice_pdfs, overridable with settings.INVOICE_EXPORT_WORKERS"""
+    return getattr(settings, 'INVOICE_EXPORT_WORKERS', min(4, os.cpu_count() or 1))
+
+
+def init_worker(settings_module):
+    """Make Django usable in a freshly started worker process"""
+    import django
+    from django.apps import apps
+    from django.db import connections
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    if not apps.ready:
+        django.setup()
+    # Never reuse a database connection inherited from the parent
+    connections.close_all()
+
+
+def archive_entry(invoice):
+    """Cached PDF path and archive name of one invoice"""
+    from .pdf import get_invoice_pdf
+
+    return str(get_invoice_pdf(invoice)), f'{invoice.invoice_number}.pdf'
+
+
+def render_invoice(pk):
+    """archive_entry() of the invoice with primary key `pk`; runs in a worker process"""
+    from .models import Invoice
+
+    return archive_entry(Invoice.objects.select_related('customer').get(pk=pk))
+
+
+def stream_invoice_pdfs(invoices, workers=1):
+    """
+    Yield a ZIP archive of the PDFs of `invoices` chunk by chunk.
+    With a single worker everything is rendered in the current process.
+    """
+    from django.db import connections
+
+    stream = ZipStream()
+
+    with zipfile.ZipFile(stream, 'w', zipfile.ZIP_STORED) as archive:
+        if workers <= 1:
+            for invoice in invoices.select_related('customer').iterator(chunk_size=INVOICE_CHUNK_SIZE):
+                yield from add_to_archive(archive, stream, *archive_entry(invoice))
+        else:
+            # Plain ids, so no cursor is left open while the pool starts
+            pks = list(invoices.values_list('pk', flat=True))
+            # Children must open their own database connections
+            connections.close_all()
+            executor = ProcessPoolExecutor(
+                max_workers=workers, initializer=init_worker, initargs=(settings.SETTINGS_MODULE,)
+            )
+            try:
+                pending = set()
+                for pk in pks:
+                    pending.add(executor.submit(render_invoice, pk))
+                    # Keep at most two invoices per worker in flight
+                    if len(pending) >= workers * 2:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            yield from add_to_archive(archive, stream, *future.result())
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield from add_to_archive(archive, stream, *future.result())
+            finally:
+                executor.shutdown(cancel_futures=True)
+
+    # Central directory written when the archive closes
+    yield stream.pop()
+
+
+def add_to_archive(archive, stream, path, name):
+    """Copy one PDF into the archive, yielding the compressed bytes as they are produced"""
+    with open(path, 'rb') as source, archive.open(name, 'w') as target:
+        while chunk := source.read(CHUNK_SIZE):
+            target.write(chunk)
+            yield stream.pop()
+    yield stream.pop()
+    logger.debug(f"Added {name} to invoice export")
@@ -133,6 +133,23 @@ class BrideForm(forms.ModelForm):
             }),
         }
 
+class BookingImportForm(forms.Form):
+    """Upload form for importing bookings from CSV (see imports.py)"""
+    csv_file = forms.FileField(
+        label='CSV file',
+        widget=forms.FileInput(attrs={
+            'class': 'form-control',
+            'accept': '.csv,text/csv'
+        })
+    )
+    dry_run = forms.BooleanField(
+        required=False,
+        label='Only validate, do not import',
+        widget=forms.CheckboxInput(attrs={
+            'class': 'form-check-input'
+        })
+    )
+
 # Create formset for invoice items
 InvoiceItemFormSet = inlineformset_factory(
     Invoice, 
@@ -0,0 +1,362 @@
+"""
+Resized and re-encoded derivatives of uploaded bride photos.
+
+Each original ``brides/<name>.<ext>`` gets JPEG copies named
+``brides/<name>_<width>w.jpg`` for every configured width smaller than the
+original, so templates can offer them through ``srcset``. When Pillow has the
+encoders, WebP and AVIF copies (``_<width>w.webp``/``.avif``) are written at
+the same widths plus the original width, for ``<picture>`` sources.
+
+Uploads are normalised before they are stored (normalize_upload(), run
+from a pre_save signal): EXIF orientation is applied to the pixels, metadata
+is dropped and the photo is re-encoded as a progressive JPEG.
+
+Static images are optimised at collectstatic time (see
+storage.PrecompressedManifestStorage) with optimize_static_image().
+"""
+import logging
+import os
+from fnmatch import fnmatch
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WIDTHS = (320, 640, 1280)
+DEFAULT_QUALITY = 82
+
+# Modern encodings in order of preference: extension -> (MIME type, Pillow format, quality)
+MODERN_FORMATS = {
+    'avif': ('image/avif', 'AVIF', 55),
+    'webp': ('image/webp', 'WEBP', 78),
+}
+
+# Uploaded photos are re-encoded at no more than this quality and long edge
+DEFAULT_UPLOAD_QUALITY = 85
+DEFAULT_UPLOAD_MAX_EDGE = 3000
+
+# libjpeg's quality-50 luminance table, for estimate_jpeg_quality()
+STANDARD_LUMINANCE_TABLE = [
+    16, 11, 10, 16, 24, 40, 51, 61,
+    12, 12, 14, 19, 26, 58, 60, 55,
+    14, 13, 16, 24, 40, 57, 69, 56,
+    14, 17, 22, 29, 51, 87, 80, 62,
+    18, 22, 37, 56, 68, 109, 103, 77,
+    24, 35, 55, 64, 81, 104, 113, 92,
+    49, 64, 78, 87, 103, 121, 120, 101,
+    72, 92, 95, 98, 112, 100, 103, 99,
+]
+
+# Default `sizes` attribute matching the gallery's 1/2/3-column grid
+GALLERY_SIZES = '(max-width: 767px) 100vw, (max-width: 991px) 50vw, 33vw'
+
+# Longest edge in pixels of collected static images, by glob pattern; first match wins
+DEFAULT_STATIC_MAX_EDGES = {
+    # Shown at 150 CSS pixels at most
+    'BridesOfSaima/images/instaQR.*': 480,
+    '*': 2400,
+}
+
+
+def get_widths():
+    """Derivative widths, overridable with settings.BRIDE_IMAGE_WIDTHS"""
+    return tuple(sorted(getattr(settings, 'BRIDE_IMAGE_WIDTHS', DEFAULT_WIDTHS)))
+
+
+def get_modern_formats():
+    """Modern encodings enabled in settings and supported by the local Pillow build"""
+    from PIL import features
+
+    wanted = getattr(settings, 'BRIDE_IMAGE_MODERN_FORMATS', tuple(MODERN_FORMATS))
+    return [ext for ext in MODERN_FORMATS if ext in wanted and features.check(ext)]
+
+
+def derivative_name(name, width, extension='jpg'):
+    """Storage name of the derivative of `name` at `width` pixels"""
+    stem, _ = os.path.splitext(name)
+    return f'{stem}_{width}w.{extension}'
+
+
+def available_widths(original_width):
+    """Derivative widths generated for an original of the given width"""
+    if not original_width:
+        return []
+    return [width for width in get_widths() if width < original_width]
+
+
+def build_srcset(field_file, original_width, extension='jpg'):
+    """`srcset` value for an image field, or '' when no derivatives exist yet"""
+    widths = available_widths(original_width)
+    if not field_file or not original_width:
+        return ''
+    if extension == 'jpg' and not widths:
+        return ''
+    storage = field_file.storage
+    candidates = [f'{storage.url(derivative_name(field_file.name, width, extension))} {width}w' for width in widths]
+    if extension == 'jpg':
+        candidates.append(f'{field_file.url} {original_width}w')
+    else:
+        # Modern encodings also get a full-width copy of the original
+        candidates.append(f'{storage.url(derivative_name(field_file.name, original_width, extension))} {original_width}w')
+    return ', '.join(candidates)
+
+
+def build_sources(field_file, original_width, formats):
+    """`<source>` type/srcset pairs for the modern encodings recorded in `formats`"""
+    sources = []
+    for extension in MODERN_FORMATS:
+        if extension in (formats or '').split(','):
+            srcset = build_srcset(field_file, original_width, extension)
+            if srcset:
+                sources.append({'type': MODERN_FORMATS[extension][0], 'srcset': srcset})
+    return sources
+
+
+def estimate_jpeg_quality(image):
+    """Approximate quality (1-100) a JPEG was saved with, from its luminance table, or None"""
+    tables = getattr(image, 'quantization', None)
+    if not tables or 0 not in tables:
+        return None
+    # libjpeg scales the standard table by 5000/q below quality 50 and 200-2q above
+    scale = sum(tables[0]) * 100 / sum(STANDARD_LUMINANCE_TABLE)
+    quality = (200 - scale) / 2 if scale <= 100 else 5000 / scale
+    return max(1, min(100, round(quality)))
+
+
+def normalize_upload(upload):
+    """
+    Re-encode an uploaded photo as a progressive JPEG named <stem>.jpg, with
+    the EXIF orientation applied to the pixels and every metadata block but
+    the colour profile dropped (GPS position, thumbnails, maker notes). The
+    long edge is limited to settings.BRIDE_UPLOAD_MAX_EDGE and the quality to
+    settings.BRIDE_UPLOAD_QUALITY, or the photo's own quality when lower.
+    """
+    from PIL import Image, ImageOps
+
+    upload.seek(0)
+    with Image.open(upload) as original:
+        original.load()
+        source_quality = estimate_jpeg_quality(original) if original.format == 'JPEG' else None
+        # A CMYK profile no longer applies once the pixels are RGB
+        icc_profile = original.info.get('icc_profile') if original.mode != 'CMYK' else None
+        image = ImageOps.exif_transpose(original)
+
+    max_edge = getattr(settings, 'BRIDE_UPLOAD_MAX_EDGE', DEFAULT_UPLOAD_MAX_EDGE)
+    image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+    if image.mode in ('RGBA', 'LA', 'P', 'PA'):
+        # JPEG has no transparency: flatten onto white
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    elif image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    quality = getattr(settings, 'BRIDE_UPLOAD_QUALITY', DEFAULT_UPLOAD_QUALITY)
+    # Re-encoding above the source quality only adds bytes
+    quality = min(quality, source_quality or quality)
+    options = {'icc_profile': icc_profile} if icc_profile else {}
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=quality, optimize=True, progressive=True, **options)
+
+    stem, _ = os.path.splitext(os.path.basename(upload.name or 'photo'))
+    return ContentFile(buffer.getvalue(), name=f'{stem}.jpg')
+
+
+def save_encoded(storage, name, image, pillow_format, **options):
+    """Encode `image` and store it under `name`, replacing any previous file"""
+    buffer = BytesIO()
+    image.save(buffer, pillow_format, **options)
+    # Replace rather than let the storage pick a new suffixed name
+    if storage.exists(name):
+        storage.delete(name)
+    storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def save_modern(storage, name, image, extension):
+    """Store `image` in one of the MODERN_FORMATS encodings"""
+    _, pillow_format, quality = MODERN_FORMATS[extension]
+    save_encoded(storage, name, image, pillow_format, quality=quality)
+
+
+def exif_orientation(field_file):
+    """EXIF orientation tag of a stored image, 1 (upright) when it has none"""
+    from PIL import Image
+
+    with field_file.storage.open(field_file.name, 'rb') as source, Image.open(source) as image:
+        return image.getexif().get(0x0112, 1)
+
+
+def generate_derivatives(field_file):
+    """
+    Write resized JPEG derivatives, plus WebP/AVIF encodings when available,
+    next to the original. Returns the original's width and the modern formats
+    written, which the models store in `image_width` and `image_formats`.
+    Widths are those of the photo as displayed, after its EXIF orientation.
+    """
+    from PIL import Image, ImageOps
+
+    storage = field_file.storage
+    quality = getattr(settings, 'BRIDE_IMAGE_QUALITY', DEFAULT_QUALITY)
+    modern_formats = get_modern_formats()
+
+    with storage.open(field_file.name, 'rb') as source:
+        with Image.open(source) as original:
+            original.load()
+            # Re-encoding drops the orientation tag, so rotate the pixels instead
+            original = ImageOps.exif_transpose(original)
+            original_width, original_height = original.size
+            if original.mode != 'RGB':
+                original = original.convert('RGB')
+
+            for width in available_widths(original_width):
+                height = max(1, round(original_height * width / original_width))
+                resized = original.resize((width, height), Image.LANCZOS)
+                save_encoded(storage, derivative_name(field_file.name, width), resized, 'JPEG',
+                             quality=quality, optimize=True, progressive=True)
+                for extension in modern_formats:
+                    save_modern(storage, derivative_name(field_file.name, width, extension), resized, extension)
+
+            # Full-size modern copies; the original itself stays the JPEG fallback
+            for extension in modern_formats:
+                save_modern(storage, derivative_name(field_file.name, original_width, extension), original, extension)
+
+    return original_width, ','.join(modern_formats)
+
+
+def delete_derivatives(storage, name, original_width=None):
+    """Remove every derivative of a stored image, ignoring ones that do not exist"""
+    widths = list(get_widths()) + ([original_width] if original_width else [])
+    names = [derivative_name(name, width) for width in get_widths()]
+    for extension in MODERN_FORMATS:
+        names += [derivative_name(name, width, extension) for width in widths]
+    for derivative in names:
+        try:
+            if storage.exists(derivative):
+                storage.delete(derivative)
+        except OSError as e:
+            logger.warning(f"Could not delete derivative {derivative}: {e}")
+
+
+def release_image(storage, name, original_width=None):
+    """
+    Delete a stored image and its derivatives once no Bride or BrideImage
+    references it any more. Returns True when the files were removed.
+    """
+    from .models import Bride, BrideImage
+
+    if not name:
+        return False
+    if Bride.objects.filter(image=name).exists() or BrideImage.objects.filter(image=name).exists():
+        return False
+
+    from .resize import delete_resized
+
+    try:
+        delete_derivatives(storage, name, original_width)
+        delete_resized(name)
+        if storage.exists(name):
+            storage.delete(name)
+    except OSError as e:
+        logger.warning(f"Could not delete unreferenced image {name}: {e}")
+        return False
+    return True
+
+
+def copy_processed_state(instance):
+    """
+    Reuse the derivatives of another row sharing the same stored image.
+    Returns True when such a row existed, so no new work is needed.
+    """
+    from .models import Bride, BrideImage
+
+    for model in (Bride, BrideImage):
+        siblings = model.objects.filter(image=instance.image.name, image_width__isnull=False)
+        if model is type(instance):
+            siblings = siblings.exclude(pk=instance.pk)
+        processed = siblings.values('image_width', 'image_formats').first()
+        if processed:
+            instance.image_width = processed['image_width']
+            instance.image_formats = processed['image_formats']
+            type(instance).objects.filter(pk=instance.pk).update(**processed)
+            return True
+    return False
+
+
+def process_image(instance, fail_silently=True):
+    """Generate derivatives for `instance.image` and record them on the row"""
+    if not instance.image:
+        return None
+    try:
+        width, formats = generate_derivatives(instance.image)
+    except Exception as e:
+        if not fail_silently:
+            raise
+        logger.error(f"Could not generate derivatives for {instance.image.name}: {e}")
+        return None
+
+    instance.image_width = width
+    instance.image_formats = formats
+    type(instance).objects.filter(pk=instance.pk).update(image_width=width, image_formats=formats)
+    return width
+
+
+def get_static_max_edge(name):
+    """Longest edge allowed for static image `name`, overridable with settings.STATIC_IMAGE_MAX_EDGES"""
+    for pattern, edge in getattr(settings, 'STATIC_IMAGE_MAX_EDGES', DEFAULT_STATIC_MAX_EDGES).items():
+        if fnmatch(name, pattern):
+            return edge
+    return None
+
+
+def webp_twin_name(name):
+    """Name of the WebP copy written next to static image `name`"""
+    stem, _ = os.path.splitext(name)
+    return f'{stem}.webp'
+
+
+def optimize_static_image(content, name):
+    """
+    Re-encode the bytes of a static JPEG or PNG without metadata, downscaled
+    to its max edge. PNGs are reduced to a 256-colour palette unless
+    settings.STATIC_IMAGE_QUANTIZE is False. Returns the optimised bytes and
+    a WebP twin, each None when it would not be smaller than the alternative.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(BytesIO(content)) as original:
+        original.load()
+        is_png = original.format == 'PNG'
+        icc_profile = original.info.get('icc_profile')
+        # Metadata is dropped, so bake the EXIF orientation into the pixels
+        image = ImageOps.exif_transpose(original)
+
+    max_edge = get_static_max_edge(name)
+    if max_edge:
+        image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+    if image.mode in ('RGBA', 'LA') and image.getextrema()[-1][0] == 255:
+        image = image.convert('RGB')  # Fully opaque, the alpha channel is dead weight
+    options = {'icc_profile': icc_profile} if icc_profile else {}
+
+    buffer = BytesIO()
+    if is_png:
+        if getattr(settings, 'STATIC_IMAGE_QUANTIZE', True) and image.mode in ('RGB', 'RGBA'):
+            image = image.quantize(256, method=Image.Quantize.FASTOCTREE)
+        image.save(buffer, 'PNG', optimize=True, **options)
+    else:
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        quality = getattr(settings, 'BRIDE_IMAGE_QUALITY', DEFAULT_QUALITY)
+        image.save(buffer, 'JPEG', quality=quality, optimize=True, progressive=True, **options)
+    optimized = buffer.getvalue() if buffer.tell() < len(content) else None
+
+    webp = BytesIO()
+    if is_png:
+        # Lossless, so the twin shows exactly the pixels of the PNG
+        image.convert('RGBA' if image.has_transparency_data else 'RGB').save(webp, 'WEBP', lossless=True, method=6)
+    else:
+        image.save(webp, 'WEBP', quality=MODERN_FORMATS['webp'][2], method=6, **options)
+    webp = webp.getvalue() if webp.tell() < len(optimized or content) else None
+    return optimized, webp
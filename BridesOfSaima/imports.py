@@ -0,0 +1,270 @@
+"""
+Bulk import of historical bookings from CSV.
+
+Each CSV row is one invoice line item carrying its customer and invoice
+details; rows sharing an invoice number form one invoice (rows without a
+number are invoices of their own). Headers are matched case-insensitively
+and the column labels of the CSV export are accepted too, so an export can
+be imported back:
+
+    name (or customer), email, phone, address, invoice_number, issue_date,
+    due_date, payment_status, discount_percentage, tax_percentage,
+    advance_amount, notes, description (or item), quantity, unit_price
+
+Rows are validated with CustomerForm, InvoiceForm and InvoiceItemForm.
+Customers are matched to existing or earlier imported ones by phone, then
+email. Everything is written with bulk_create in one transaction per chunk
+of invoices, so the save() hooks and signals do not run: invoice numbers and
+totals are filled in here and the monthly rollups are rebuilt at the end.
+"""
+import csv
+import logging
+import re
+from decimal import Decimal
+
+from django.db import transaction
+
+from .forms import CustomerForm, InvoiceForm, InvoiceItemForm
+from .models import Customer, Invoice, InvoiceItem, InvoiceSequence, MonthlyRevenueRollup
+
+logger = logging.getLogger(__name__)
+
+# Invoices written per transaction
+CHUNK_SIZE = 1000
+
+# Alternative header spellings, including the CSV export's labels
+COLUMN_ALIASES = {
+    'customer': 'name',
+    'customer_name': 'name',
+    'item': 'description',
+    'discount_%': 'discount_percentage',
+    'tax_%': 'tax_percentage',
+    'advance': 'advance_amount',
+}
+
+CUSTOMER_FIELDS = ['name', 'email', 'phone', 'address']
+INVOICE_FIELDS = ['issue_date', 'due_date', 'payment_status', 'discount_percentage', 'tax_percentage', 'advance_amount', 'notes']
+ITEM_FIELDS = ['description', 'quantity', 'unit_price']
+
+# Defaults matching the model field defaults
+INVOICE_DEFAULTS = {
+    'payment_status': 'pending',
+    'discount_percentage': '0',
+    'tax_percentage': '0',
+    'advance_amount': '0',
+}
+
+
+def normalize_header(header):
+    key = re.sub(r'\s+', '_', (header or '').strip().lower())
+    return COLUMN_ALIASES.get(key, key)
+
+
+def phone_key(phone):
+    """
+    Last ten digits of a phone number, used to recognise the same customer
+    with or without the country code
+    """
+    return re.sub(r'\D', '', phone or '')[-10:]
+
+
+def email_key(email):
+    return (email or '').strip().lower()
+
+
+def form_errors(form):
+    return '; '.join(f'{field}: {" ".join(errors)}' for field, errors in form.errors.items())
+
+
+class RowValidator:
+    """Validates rows with a ModelForm, leaving out the `exclude` fields"""
+
+    def __init__(self, form_class, exclude=()):
+        self.form_class = form_class
+        self.exclude = exclude
+
+    def validate(self, data):
+        """Unsaved model instance and cleaned data for a row, or ValueError with the form errors"""
+        form = self.form_class(data=data)
+        for name in self.exclude:
+            del form.fields[name]
+        if not form.is_valid():
+            raise ValueError(form_errors(form))
+        return form.save(commit=False), form.cleaned_data
+
+
+class CustomerIndex:
+    """Customers by phone and email, seeded from the database"""
+
+    def __init__(self):
+        self.by_phone = {}
+        self.by_email = {}
+        for customer in Customer.objects.only('id', 'phone', 'email').iterator(chunk_size=2000):
+            self.add(customer)
+
+    def add(self, customer):
+        if phone_key(customer.phone):
+            self.by_phone.setdefault(phone_key(customer.phone), customer)
+        if email_key(customer.email):
+            self.by_email.setdefault(email_key(customer.email), customer)
+
+    def find(self, phone, email):
+        return self.by_phone.get(phone_key(phone)) or self.by_email.get(email_key(email))
+
+
+def read_rows(csv_file):
+    """
+    Parse the CSV into (line number, row) pairs with normalised keys.
+    `csv_file` is any iterable of text lines.
+    """
+    reader = csv.DictReader(csv_file)
+    reader.fieldnames = [normalize_header(header) for header in reader.fieldnames or []]
+    for row in reader:
+        yield reader.line_num, {key: (value or '').strip() for key, value in row.items() if key}
+
+
+def group_invoices(rows):
+    """Group parsed rows into invoices, keyed by invoice number in file order"""
+    invoices = {}
+    for line, row in rows:
+        key = row.get('invoice_number') or f'line-{line}'
+        invoices.setdefault(key, []).append((line, row))
+    return invoices
+
+
+def status_value(value):
+    """Accept a payment status key or its display label"""
+    for key, label in Invoice.PAYMENT_STATUS_CHOICES:
+        if value.lower() in (key, label.lower()):
+            return key
+    return value
+
+
+def build_invoice(rows, validators):
+    """
+    Validate the rows of one invoice with the app's forms.
+    Returns (customer data, Invoice, [InvoiceItem]) or raises ValueError
+    with the row-level errors.
+    """
+    errors = []
+    first_line, first = rows[0]
+
+    customer_data = invoice = None
+    try:
+        _, customer_data = validators['customer'].validate({field: first.get(field, '') for field in CUSTOMER_FIELDS})
+    except ValueError as e:
+        errors.append((first_line, str(e)))
+
+    data = {**INVOICE_DEFAULTS, **{field: first[field] for field in INVOICE_FIELDS if first.get(field)}}
+    data['payment_status'] = status_value(data['payment_status'])
+    try:
+        invoice, _ = validators['invoice'].validate(data)
+    except ValueError as e:
+        errors.append((first_line, str(e)))
+
+    number = first.get('invoice_number', '')
+    if len(number) > Invoice._meta.get_field('invoice_number').max_length:
+        errors.append((first_line, f'invoice_number: {number} is too long'))
+
+    items = []
+    for line, row in rows:
+        if not any(row.get(field) for field in ITEM_FIELDS):
+            continue  # Invoice without line items
+        try:
+            item, _ = validators['item'].validate({field: row.get(field, '') for field in ITEM_FIELDS})
+            items.append(item)
+        except ValueError as e:
+            errors.append((line, str(e)))
+
+    if errors:
+        raise ValueError(errors)
+
+    invoice.invoice_number = number
+    invoice.apply_totals(sum((item.get_total() for item in items), Decimal('0.00')))
+    return customer_data, invoice, items
+
+
+def import_bookings(csv_file, chunk_size=CHUNK_SIZE, dry_run=False):
+    """
+    Import bookings from a CSV file. Invalid invoices are skipped and
+    reported; everything else is written. Returns a summary dict with the
+    created counts and a list of (line number, message) errors.
+    """
+    result = {'customers': 0, 'invoices': 0, 'items': 0, 'errors': []}
+    invoices = list(group_invoices(read_rows(csv_file)).values())
+    customers = CustomerIndex()
+    validators = {
+        'customer': RowValidator(CustomerForm),
+        # The customer is resolved after validation
+        'invoice': RowValidator(InvoiceForm, exclude=['customer']),
+        'item': RowValidator(InvoiceItemForm),
+    }
+
+    for start in range(0, len(invoices), chunk_size):
+        chunk = []
+        for rows in invoices[start:start + chunk_size]:
+            try:
+                chunk.append((rows[0][0],) + build_invoice(rows, validators))
+            except ValueError as e:
+                result['errors'].extend(e.args[0])
+
+        # Existing numbers are reported, so re-running an import is harmless
+        numbers = [invoice.invoice_number for _, _, invoice, _ in chunk if invoice.invoice_number]
+        taken = set(Invoice.objects.filter(invoice_number__in=numbers).values_list('invoice_number', flat=True))
+        for line, _, invoice, _ in chunk:
+            if invoice.invoice_number in taken:
+                result['errors'].append((line, f'Invoice {invoice.invoice_number} already exists'))
+        chunk = [entry for entry in chunk if entry[2].invoice_number not in taken]
+
+        if dry_run:
+            result['invoices'] += len(chunk)
+            result['items'] += sum(len(items) for _, _, _, items in chunk)
+            continue
+
+        with transaction.atomic():
+            new_customers = []
+            for _, customer_data, invoice, _ in chunk:
+                customer = customers.find(customer_data['phone'], customer_data['email'])
+                if customer is None:
+                    customer = Customer(**customer_data)
+                    customers.add(customer)
+                    new_customers.append(customer)
+                invoice.customer = customer
+            Customer.objects.bulk_create(new_customers)
+
+            # One counter update per year for the whole chunk
+            unnumbered = {}
+            for _, _, invoice, _ in chunk:
+                if not invoice.invoice_number:
+                    unnumbered.setdefault(invoice.issue_date.year, []).append(invoice)
+            for year, year_invoices in unnumbered.items():
+                for invoice, number in zip(year_invoices, Invoice.new_invoice_numbers(year, len(year_invoices))):
+                    invoice.invoice_number = number
+            Invoice.objects.bulk_create([invoice for _, _, invoice, _ in chunk])
+
+            items = []
+            for _, _, invoice, invoice_items in chunk:
+                for item in invoice_items:
+                    item.invoice = invoice
+                    items.append(item)
+            InvoiceItem.objects.bulk_create(items, batch_size=2000)
+
+            # Keep the counters ahead of imported numbers in the same format
+            highest = {}
+            for _, _, invoice, _ in chunk:
+                parsed = Invoice.parse_invoice_number(invoice.invoice_number)
+                if parsed:
+                    highest[parsed[0]] = max(highest.get(parsed[0], 0), parsed[1])
+            for year, number in highest.items():
+                InvoiceSequence.advance_past(year, number)
+
+        result['customers'] += len(new_customers)
+        result['invoices'] += len(chunk)
+        result['items'] += len(items)
+        logger.info(f"Imported {result['invoices']} of {len(invoices)} invoices")
+
+    if not dry_run and result['invoices']:
+        # bulk_create() bypasses the signals that maintain the rollups
+        MonthlyRevenueRollup.rebuild()
+    result['errors'].sort()
+    return result
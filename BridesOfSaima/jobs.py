@@ -0,0 +1,104 @@
+"""
+Small database-backed job queue.
+
+Tasks are plain functions registered with ``@task('name')`` (see tasks.py),
+queued with ``enqueue('name', **payload)`` and executed by
+``python manage.py run_worker``. No broker is needed: jobs are rows of the
+``Job`` model, claimed with a conditional UPDATE so several workers can share
+the table safely.
+"""
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+
+# Seconds before retry n is attempted: RETRY_DELAY * 2 ** (n - 1)
+RETRY_DELAY = 30
+
+# Running jobs older than this are assumed to belong to a dead worker
+STALE_AFTER = timedelta(minutes=15)
+
+
+def task(name):
+    """Register a function as a queueable task"""
+    def register(func):
+        TASKS[name] = func
+        return func
+    return register
+
+
+def enqueue(task_name, max_attempts=3, unique=False, **payload):
+    """
+    Queue a task; with settings.JOBS_RUN_INLINE it runs immediately instead.
+    With unique=True an identical job that is still pending is reused.
+    """
+    from .models import Job
+
+    if task_name not in TASKS:
+        raise KeyError(f"Unknown task: {task_name}")
+
+    if unique:
+        existing = Job.objects.filter(task=task_name, payload=payload, status='pending').first()
+        if existing is not None:
+            return existing
+
+    job = Job.objects.create(task=task_name, payload=payload, max_attempts=max_attempts)
+    if getattr(settings, 'JOBS_RUN_INLINE', False):
+        run_job(job)
+    return job
+
+
+def claim_next_job():
+    """Atomically mark the next due job as running and return it, or None"""
+    from .models import Job
+
+    now = timezone.now()
+    for job in Job.objects.filter(status='pending', run_after__lte=now)[:10]:
+        # Only one worker can win the pending -> running transition
+        claimed = Job.objects.filter(pk=job.pk, status='pending').update(
+            status='running', started_at=now, attempts=job.attempts + 1
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+    return None
+
+
+def run_job(job):
+    """Execute a claimed job and record the outcome"""
+    from .models import Job
+
+    if job.status != 'running':
+        Job.objects.filter(pk=job.pk).update(status='running', started_at=timezone.now(), attempts=job.attempts + 1)
+        job.refresh_from_db()
+
+    try:
+        TASKS[job.task](**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        logger.error(f"Job {job.pk} ({job.task}) failed: {error}")
+        if job.attempts >= job.max_attempts:
+            updates = {'status': 'failed', 'finished_at': timezone.now()}
+        else:
+            delay = RETRY_DELAY * 2 ** (job.attempts - 1)
+            updates = {'status': 'pending', 'run_after': timezone.now() + timedelta(seconds=delay)}
+        Job.objects.filter(pk=job.pk).update(last_error=error, updated_at=timezone.now(), **updates)
+        return False
+
+    Job.objects.filter(pk=job.pk).update(status='done', finished_at=timezone.now(), updated_at=timezone.now())
+    return True
+
+
+def requeue_stale_jobs():
+    """Return jobs left running by a worker that died to the pending state"""
+    from .models import Job
+
+    return Job.objects.filter(
+        status='running', started_at__lt=timezone.now() - STALE_AFTER
+    ).update(status='pending', run_after=timezone.now(), updated_at=timezone.now())
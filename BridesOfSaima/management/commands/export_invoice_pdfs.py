@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from BridesOfSaima.exports import get_export_workers, stream_invoice_pdfs
+from BridesOfSaima.models import Invoice
+
+class Command(BaseCommand):
+    help = 'Export the PDFs of the invoices for a period into one ZIP file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Path of the ZIP file to write')
+        parser.add_argument('--month', type=int, help='Only invoices issued in this month (1-12)')
+        parser.add_argument('--year', type=int, help='Only invoices issued in this year')
+        parser.add_argument(
+            '--status',
+            choices=[status for status, _ in Invoice.PAYMENT_STATUS_CHOICES],
+            help='Only invoices with this payment status',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Processes rendering PDFs in parallel (default: settings.INVOICE_EXPORT_WORKERS)',
+        )
+
+    def handle(self, *args, **options):
+        if options['month'] and not 1 <= options['month'] <= 12:
+            raise CommandError('--month must be between 1 and 12')
+        
+        invoices = Invoice.for_period(options['month'], options['year']).order_by('issue_date', 'pk')
+        if options['status']:
+            invoices = invoices.filter(payment_status=options['status'])
+        count = invoices.count()
+        
+        with open(options['output'], 'wb') as output:
+            for chunk in stream_invoice_pdfs(invoices, workers=options['workers'] or get_export_workers()):
+                output.write(chunk)
+        
+        self.stdout.write(self.style.SUCCESS(f"✅ Exported {count} invoice PDF(s) to {options['output']}"))
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+from BridesOfSaima.images import delete_derivatives, exif_orientation, process_image
+from BridesOfSaima.models import Bride, BrideImage
+
+class Command(BaseCommand):
+    help = 'Generate resized copies of bride images that do not have them yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Regenerate derivatives for images that already have them',
+        )
+        parser.add_argument(
+            '--rotated',
+            action='store_true',
+            help='Regenerate derivatives of photos with an EXIF rotation (copies written before it was applied are sideways)',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('🖼️  Generating bride image derivatives...'))
+        
+        for model in (Bride, BrideImage):
+            queryset = model.objects.exclude(image='').order_by('pk')
+            if options['rotated']:
+                queryset = queryset.filter(image_width__isnull=False)
+            elif not options['force']:
+                queryset = queryset.filter(image_width__isnull=True)
+            
+            processed = failed = 0
+            for instance in queryset.iterator():
+                if options['rotated']:
+                    if not self.is_rotated(instance):
+                        continue
+                    # The old copies may be named after the unrotated width
+                    delete_derivatives(instance.image.storage, instance.image.name, instance.image_width)
+                if process_image(instance):
+                    processed += 1
+                    self.stdout.write(f"✅ {instance.image.name}")
+                else:
+                    failed += 1
+                    self.stdout.write(self.style.ERROR(f"❌ Could not process: {instance.image.name}"))
+            
+            self.stdout.write(f"{model._meta.verbose_name_plural}: {processed} processed, {failed} failed")
+
+    def is_rotated(self, instance):
+        """Whether the stored photo carries an EXIF orientation other than upright"""
+        try:
+            return exif_orientation(instance.image) != 1
+        except (OSError, ValueError) as e:
+            self.stdout.write(self.style.ERROR(f"❌ Could not read: {instance.image.name} ({e})"))
+            return False
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from BridesOfSaima.imports import CHUNK_SIZE, import_bookings
+
+class Command(BaseCommand):
+    help = 'Import customers, invoices and line items from a CSV file of bookings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file', help='CSV file with one line item per row')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=CHUNK_SIZE,
+            help='Number of invoices written per transaction',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Validate the file and report errors without writing anything',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['csv_file'], newline='', encoding='utf-8-sig') as csv_file:
+                result = import_bookings(csv_file, chunk_size=options['chunk_size'], dry_run=options['dry_run'])
+        except OSError as e:
+            raise CommandError(f'Could not read {options["csv_file"]}: {e}')
+        
+        for line, message in result['errors']:
+            self.stdout.write(self.style.ERROR(f'❌ Line {line}: {message}'))
+        
+        verb = 'Validated' if options['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {verb} {result['invoices']} invoice(s) with {result['items']} item(s), "
+            f"{result['customers']} new customer(s)"
+        ))
+        if result['errors']:
+            self.stdout.write(self.style.WARNING(f"⚠️ {len(result['errors'])} row(s) skipped"))
@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from BridesOfSaima.models import MonthlyRevenueRollup
+
+class Command(BaseCommand):
+    help = 'Rebuild the monthly revenue rollups from the full invoice history'
+
+    def handle(self, *args, **options):
+        count = MonthlyRevenueRollup.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'✅ Rebuilt {count} monthly rollup(s)'))
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from BridesOfSaima.models import Invoice, MonthlyRevenueRollup
+
+class Command(BaseCommand):
+    help = 'Recalculate the stored totals of invoices from their line items'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of invoices updated per transaction',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        invoices = Invoice.objects.prefetch_related('items').order_by('pk')
+        
+        updated = 0
+        batch = []
+        for invoice in invoices.iterator(chunk_size=batch_size):
+            invoice.update_totals(commit=False)
+            batch.append(invoice)
+            if len(batch) >= batch_size:
+                updated += self.save_batch(batch)
+                batch = []
+        updated += self.save_batch(batch)
+        
+        self.stdout.write(self.style.SUCCESS(f'✅ Recalculated totals for {updated} invoice(s)'))
+        
+        # bulk_update() bypasses the signals, so refresh the rollups in one pass
+        count = MonthlyRevenueRollup.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'✅ Rebuilt {count} monthly rollup(s)'))
+
+    def save_batch(self, batch):
+        """Write the recalculated totals for a batch of invoices"""
+        if not batch:
+            return 0
+        with transaction.atomic():
+            Invoice.objects.bulk_update(batch, Invoice.TOTAL_FIELDS)
+        return len(batch)
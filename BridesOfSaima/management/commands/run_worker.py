@@ -0,0 +1,50 @@
+import time
+from django.core.management.base import BaseCommand
+from BridesOfSaima.jobs import claim_next_job, run_job, requeue_stale_jobs
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (image processing, cache warming, ...)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--until-empty',
+            action='store_true',
+            help='Exit once no job is due instead of polling forever (for scheduled tasks)',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=2.0,
+            help='Seconds to wait between polls when the queue is empty',
+        )
+        parser.add_argument(
+            '--max-jobs',
+            type=int,
+            default=0,
+            help='Exit after running this many jobs (0 = no limit)',
+        )
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale_jobs()
+        if requeued:
+            self.stdout.write(self.style.WARNING(f'⚠️  Requeued {requeued} stale job(s)'))
+        
+        processed = 0
+        while True:
+            job = claim_next_job()
+            if job is None:
+                if options['until_empty']:
+                    break
+                time.sleep(options['sleep'])
+                continue
+            
+            if run_job(job):
+                self.stdout.write(self.style.SUCCESS(f'✅ {job.task} #{job.pk} done'))
+            else:
+                self.stdout.write(self.style.ERROR(f'❌ {job.task} #{job.pk} failed (attempt {job.attempts}/{job.max_attempts})'))
+            
+            processed += 1
+            if options['max_jobs'] and processed >= options['max_jobs']:
+                break
+        
+        self.stdout.write(f'Processed {processed} job(s)')
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from BridesOfSaima.resize import sweep_cache
+
+class Command(BaseCommand):
+    help = 'Delete the least recently used resized photos once the resize cache is over its size limit'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-size', type=int, help='Cache size limit in bytes (default: IMAGE_RESIZE_CACHE_SIZE)')
+
+    def handle(self, *args, **options):
+        removed = sweep_cache(options['max_size'])
+        self.stdout.write(self.style.SUCCESS(f'✅ Removed {removed} resized photo(s)'))
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-17 12:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('BridesOfSaima', '0007_monthlyrevenuerollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bride',
+            name='image_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, help_text='Width of the original image once its resized copies exist', null=True),
+        ),
+        migrations.AddField(
+            model_name='brideimage',
+            name='image_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, help_text='Width of the original image once its resized copies exist', null=True),
+        ),
+    ]
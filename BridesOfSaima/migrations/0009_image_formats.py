@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-17 12:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('BridesOfSaima', '0008_image_width'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bride',
+            name='image_formats',
+            field=models.CharField(blank=True, editable=False, help_text='Modern encodings (e.g. avif,webp) written alongside the JPEG copies', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='brideimage',
+            name='image_formats',
+            field=models.CharField(blank=True, editable=False, help_text='Modern encodings (e.g. avif,webp) written alongside the JPEG copies', max_length=50),
+        ),
+    ]
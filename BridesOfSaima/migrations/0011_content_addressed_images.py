@@ -0,0 +1,25 @@
+# Generated by Django 5.2.6 on 2026-10-17 12:11
+
+import BridesOfSaima.models
+import BridesOfSaima.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('BridesOfSaima', '0010_job'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='bride',
+            name='image',
+            field=models.ImageField(help_text='Main bride photo for gallery thumbnail', storage=BridesOfSaima.storage.ContentAddressedStorage(), upload_to=BridesOfSaima.models.bride_main_image_path),
+        ),
+        migrations.AlterField(
+            model_name='brideimage',
+            name='image',
+            field=models.ImageField(help_text='Additional bride photo', storage=BridesOfSaima.storage.ContentAddressedStorage(), upload_to=BridesOfSaima.models.bride_additional_image_path),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.6 on 2026-10-17 12:27
+
+from django.db import migrations, models
+
+
+def seed_sequences(apps, schema_editor):
+    """
+    Start each year's counter after the highest INV-YYYY-NNNNNN number in use.
+    Existing invoice numbers, including the older random ones, are kept as they are.
+    """
+    Invoice = apps.get_model('BridesOfSaima', 'Invoice')
+    InvoiceSequence = apps.get_model('BridesOfSaima', 'InvoiceSequence')
+    highest = {}
+    for number in Invoice.objects.filter(invoice_number__regex=r'^INV-[0-9]{4}-[0-9]+$').values_list('invoice_number', flat=True):
+        _, year, sequence = number.split('-')
+        highest[int(year)] = max(highest.get(int(year), 0), int(sequence))
+    InvoiceSequence.objects.bulk_create(
+        InvoiceSequence(year=year, last_number=number) for year, number in highest.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('BridesOfSaima', '0011_content_addressed_images'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InvoiceSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveIntegerField(unique=True)),
+                ('last_number', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['year'],
+            },
+        ),
+        migrations.RunPython(seed_sequences, migrations.RunPython.noop),
+    ]
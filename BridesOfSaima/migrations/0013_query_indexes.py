@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-17 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('BridesOfSaima', '0012_invoicesequence'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bride',
+            index=models.Index(fields=['-event_date', '-created_at', '-id'], name='bride_gallery_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='brideimage',
+            index=models.Index(fields=['bride', 'order', 'created_at'], name='brideimage_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['-created_at'], name='invoice_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['issue_date'], name='invoice_issue_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['payment_status', 'issue_date'], name='invoice_status_date_idx'),
+        ),
+    ]
@@ -0,0 +1,130 @@
+from django.db import migrations
+
+
+# FTS5 tables keyed by the row id of the indexed model. They are filled by
+# triggers, so rows written with bulk_create() (e.g. by the booking import)
+# and raw UPDATEs are indexed too.
+TOKENIZER = "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'"
+
+INVOICE_ITEMS = (
+    "(SELECT group_concat(description, ' ') FROM BridesOfSaima_invoiceitem WHERE invoice_id = {invoice_id})"
+)
+
+REINDEX_INVOICE = (
+    "DELETE FROM BridesOfSaima_invoice_fts WHERE rowid = {invoice_id}; "
+    "INSERT INTO BridesOfSaima_invoice_fts (rowid, invoice_number, notes, items) "
+    "SELECT id, invoice_number, coalesce(notes, ''), coalesce(" + INVOICE_ITEMS + ", '') "
+    "FROM BridesOfSaima_invoice WHERE id = {invoice_id};"
+)
+
+CUSTOMER_SQL = [
+    f"CREATE VIRTUAL TABLE BridesOfSaima_customer_fts USING fts5(name, email, phone, address, {TOKENIZER})",
+    """
+    CREATE TRIGGER BridesOfSaima_customer_fts_insert AFTER INSERT ON BridesOfSaima_customer BEGIN
+        INSERT INTO BridesOfSaima_customer_fts (rowid, name, email, phone, address)
+        VALUES (new.id, new.name, coalesce(new.email, ''), coalesce(new.phone, ''), coalesce(new.address, ''));
+    END
+    """,
+    """
+    CREATE TRIGGER BridesOfSaima_customer_fts_update AFTER UPDATE ON BridesOfSaima_customer BEGIN
+        DELETE FROM BridesOfSaima_customer_fts WHERE rowid = old.id;
+        INSERT INTO BridesOfSaima_customer_fts (rowid, name, email, phone, address)
+        VALUES (new.id, new.name, coalesce(new.email, ''), coalesce(new.phone, ''), coalesce(new.address, ''));
+    END
+    """,
+    """
+    CREATE TRIGGER BridesOfSaima_customer_fts_delete AFTER DELETE ON BridesOfSaima_customer BEGIN
+        DELETE FROM BridesOfSaima_customer_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    INSERT INTO BridesOfSaima_customer_fts (rowid, name, email, phone, address)
+    SELECT id, name, coalesce(email, ''), coalesce(phone, ''), coalesce(address, '') FROM BridesOfSaima_customer
+    """,
+]
+
+INVOICE_SQL = [
+    f"CREATE VIRTUAL TABLE BridesOfSaima_invoice_fts USING fts5(invoice_number, notes, items, {TOKENIZER})",
+    # Only the indexed columns; saving totals or the payment status leaves the index alone
+    f"""
+    CREATE TRIGGER BridesOfSaima_invoice_fts_insert AFTER INSERT ON BridesOfSaima_invoice BEGIN
+        {REINDEX_INVOICE.format(invoice_id='new.id')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER BridesOfSaima_invoice_fts_update AFTER UPDATE OF invoice_number, notes ON BridesOfSaima_invoice
+    WHEN old.invoice_number IS NOT new.invoice_number OR old.notes IS NOT new.notes BEGIN
+        {REINDEX_INVOICE.format(invoice_id='new.id')}
+    END
+    """,
+    """
+    CREATE TRIGGER BridesOfSaima_invoice_fts_delete AFTER DELETE ON BridesOfSaima_invoice BEGIN
+        DELETE FROM BridesOfSaima_invoice_fts WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER BridesOfSaima_invoiceitem_fts_insert AFTER INSERT ON BridesOfSaima_invoiceitem BEGIN
+        {REINDEX_INVOICE.format(invoice_id='new.invoice_id')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER BridesOfSaima_invoiceitem_fts_update AFTER UPDATE OF description, invoice_id ON BridesOfSaima_invoiceitem
+    WHEN old.description IS NOT new.description OR old.invoice_id IS NOT new.invoice_id BEGIN
+        {REINDEX_INVOICE.format(invoice_id='old.invoice_id')}
+        {REINDEX_INVOICE.format(invoice_id='new.invoice_id')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER BridesOfSaima_invoiceitem_fts_delete AFTER DELETE ON BridesOfSaima_invoiceitem BEGIN
+        {REINDEX_INVOICE.format(invoice_id='old.invoice_id')}
+    END
+    """,
+    "INSERT INTO BridesOfSaima_invoice_fts (rowid, invoice_number, notes, items) "
+    "SELECT id, invoice_number, coalesce(notes, ''), coalesce(" + INVOICE_ITEMS.format(invoice_id='BridesOfSaima_invoice.id') + ", '') "
+    "FROM BridesOfSaima_invoice",
+]
+
+BRIDE_SQL = [
+    f"CREATE VIRTUAL TABLE BridesOfSaima_bride_fts USING fts5(name, location, tagline, {TOKENIZER})",
+    """
+    CREATE TRIGGER BridesOfSaima_bride_fts_insert AFTER INSERT ON BridesOfSaima_bride BEGIN
+        INSERT INTO BridesOfSaima_bride_fts (rowid, name, location, tagline)
+        VALUES (new.id, new.name, new.location, new.tagline);
+    END
+    """,
+    """
+    CREATE TRIGGER BridesOfSaima_bride_fts_update AFTER UPDATE OF name, location, tagline ON BridesOfSaima_bride
+    WHEN old.name IS NOT new.name OR old.location IS NOT new.location OR old.tagline IS NOT new.tagline BEGIN
+        DELETE FROM BridesOfSaima_bride_fts WHERE rowid = old.id;
+        INSERT INTO BridesOfSaima_bride_fts (rowid, name, location, tagline)
+        VALUES (new.id, new.name, new.location, new.tagline);
+    END
+    """,
+    """
+    CREATE TRIGGER BridesOfSaima_bride_fts_delete AFTER DELETE ON BridesOfSaima_bride BEGIN
+        DELETE FROM BridesOfSaima_bride_fts WHERE rowid = old.id;
+    END
+    """,
+    "INSERT INTO BridesOfSaima_bride_fts (rowid, name, location, tagline) "
+    "SELECT id, name, location, tagline FROM BridesOfSaima_bride",
+]
+
+REVERSE_SQL = [
+    # The triggers belong to the model tables, so they are dropped explicitly
+    *[f"DROP TRIGGER IF EXISTS BridesOfSaima_{table}_fts_{event}"
+      for table in ('customer', 'invoice', 'invoiceitem', 'bride') for event in ('insert', 'update', 'delete')],
+    "DROP TABLE IF EXISTS BridesOfSaima_customer_fts",
+    "DROP TABLE IF EXISTS BridesOfSaima_invoice_fts",
+    "DROP TABLE IF EXISTS BridesOfSaima_bride_fts",
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('BridesOfSaima', '0013_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CUSTOMER_SQL + INVOICE_SQL + BRIDE_SQL, REVERSE_SQL),
+    ]
@@ -1,38 +1,60 @@
-from django.db import models
+from django.db import models, transaction, IntegrityError
 from django.core.validators import MinValueValidator
-from decimal import Decimal
+from django.utils import timezone
+from decimal import Decimal, ROUND_HALF_UP
+from datetime import date
+from .images import build_srcset, build_sources
+from .storage import image_storage
+import hashlib
 import uuid
 import os
 
 # Create your models here.
 
-def bride_main_image_path(instance, filename):
-    """Generate upload path for main bride images"""
-    from django.conf import settings
-    import os
-    import stat
-    import logging
+def period_bounds(year, month=None):
+    """
+    First day of the month (or year) and first day after it, for range filters
+    such as issue_date__gte/__lt that can use an index, unlike __year/__month
+    """
+    if month:
+        start = date(year, month, 1)
+        end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    else:
+        start, end = date(year, 1, 1), date(year + 1, 1, 1)
+    return start, end
+
+def sharded_upload_path(prefix, field_file, filename):
+    """
+    Upload path named after the file's SHA-256, such as brides/ab/cd/<sha256>.jpg.
+    Two levels of hash prefixes keep each directory small; the storage creates
+    missing directories itself (see FILE_UPLOAD_DIRECTORY_PERMISSIONS).
+    """
+    extension = os.path.splitext(filename)[1].lower() or '.jpg'
+    if extension == '.jpeg':
+        extension = '.jpg'  # Same content must map to the same name
     
     try:
-        # Create the directory if it doesn't exist
-        upload_dir = os.path.join(settings.MEDIA_ROOT, 'brides')
-        os.makedirs(upload_dir, exist_ok=True)
-        
-        # Set permissions for PythonAnywhere (755 for directories)
-        if not os.name == 'nt':  # Not Windows
-            try:
-                os.chmod(upload_dir, stat.S_IRWXU | stat.S_IRGRP | stat.S_IXGRP | stat.S_IROTH | stat.S_IXOTH)
-            except (OSError, PermissionError):
-                pass  # Ignore permission errors
-        
-        # Log successful directory creation
-        logging.info(f"Created/verified directory: {upload_dir}")
-        
-    except Exception as e:
-        # Log any errors but don't break the upload
-        logging.error(f"Error creating bride main image directory: {e}")
+        sha = hashlib.sha256()
+        for chunk in field_file.file.chunks():
+            sha.update(chunk)
+        field_file.file.seek(0)
+        digest = sha.hexdigest()
+    except (AttributeError, OSError, ValueError):
+        # Content not readable here; fall back to a random, still collision-free name
+        digest = uuid.uuid4().hex
     
-    return f'brides/{filename}'
+    return f'{prefix}/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+def bride_main_image_path(instance, filename):
+    """Generate upload path for main bride images"""
+    return sharded_upload_path('brides', instance.image, filename)
+
+def bride_additional_image_path(instance, filename):
+    """
+    Generate upload path for additional bride images. Shares the main images'
+    prefix so a photo used both ways is stored once.
+    """
+    return sharded_upload_path('brides', instance.image, filename)
 
 class Bride(models.Model):
     """Model for showcasing brides gallery"""
@@ -40,7 +62,9 @@ class Bride(models.Model):
     location = models.CharField(max_length=200, help_text="Wedding/event location")
     event_date = models.DateField(help_text="Date of the makeup/event")
     tagline = models.CharField(max_length=300, help_text="Special tagline or description")
-    image = models.ImageField(upload_to=bride_main_image_path, help_text="Main bride photo for gallery thumbnail")
+    image = models.ImageField(upload_to=bride_main_image_path, storage=image_storage, help_text="Main bride photo for gallery thumbnail")
+    image_width = models.PositiveIntegerField(null=True, blank=True, editable=False, help_text="Width of the original image once its resized copies exist")
+    image_formats = models.CharField(max_length=50, blank=True, editable=False, help_text="Modern encodings (e.g. avif,webp) written alongside the JPEG copies")
     is_featured = models.BooleanField(default=False, help_text="Feature this bride on homepage")
     created_at = models.DateTimeField(auto_now_add=True)
     
@@ -53,6 +77,8 @@ class Bride(models.Model):
         if self.image:
             images.append({
                 'url': self.image.url,
+                'srcset': self.get_image_srcset(),
+                'sources': self.get_image_sources(),
                 'caption': f"{self.name} - Main Photo",
                 'is_main': True
             })
@@ -60,58 +86,67 @@ class Bride(models.Model):
         for bride_image in self.additional_images.all():
             images.append({
                 'url': bride_image.image.url,
+                'srcset': bride_image.get_image_srcset(),
+                'sources': bride_image.get_image_sources(),
                 'caption': bride_image.caption or f"{self.name} - Photo {bride_image.id}",
                 'is_main': False
             })
         
         return images
     
+    def get_image_srcset(self):
+        """srcset of the resized copies of the main image"""
+        return build_srcset(self.image, self.image_width)
+    
+    def get_image_sources(self):
+        """<picture> sources for the WebP/AVIF copies of the main image"""
+        return build_sources(self.image, self.image_width, self.image_formats)
+    
     def get_total_images_count(self):
         """Get total count of all images"""
         count = 1 if self.image else 0
-        count += self.additional_images.count()
-        return count
+        # Use the annotated count when the queryset provides one (see with_images())
+        additional_count = getattr(self, 'additional_images_count', None)
+        if additional_count is None:
+            # count() reuses prefetched rows instead of querying again
+            additional_count = self.additional_images.count()
+        return count + additional_count
+    
+    @classmethod
+    def with_images(cls, queryset=None, prefetch=True):
+        """Queryset that loads the additional image count, and optionally the ordered images, up front"""
+        from django.db.models.functions import Coalesce
+        
+        if queryset is None:
+            queryset = cls.objects.all()
+        # A correlated count rather than JOIN + GROUP BY, so the gallery order
+        # is read straight off bride_gallery_idx without sorting every bride
+        image_count = (BrideImage.objects.filter(bride=models.OuterRef('pk')).order_by()
+                       .values('bride').annotate(count=models.Count('pk')).values('count'))
+        queryset = queryset.annotate(
+            additional_images_count=Coalesce(models.Subquery(image_count), 0)
+        )
+        if prefetch:
+            queryset = queryset.prefetch_related(
+                models.Prefetch('additional_images', queryset=BrideImage.objects.order_by('order', 'created_at'))
+            )
+        return queryset
     
     class Meta:
         ordering = ['-event_date', '-created_at']
+        indexes = [
+            # Gallery order and its keyset pagination (see views.get_bride_page)
+            models.Index(fields=['-event_date', '-created_at', '-id'], name='bride_gallery_idx'),
+        ]
         verbose_name = "Bride"
         verbose_name_plural = "My Brides"
 
-def bride_additional_image_path(instance, filename):
-    """Generate upload path for additional bride images"""
-    import os
-    import stat
-    import logging
-    from django.conf import settings
-    
-    try:
-        # Create the directory if it doesn't exist
-        upload_dir = os.path.join(settings.MEDIA_ROOT, 'brides', 'additional')
-        os.makedirs(upload_dir, exist_ok=True)
-        
-        # Set permissions for PythonAnywhere (755 for directories)
-        if not os.name == 'nt':  # Not Windows
-            try:
-                # Set permissions for both parent and child directories
-                parent_dir = os.path.join(settings.MEDIA_ROOT, 'brides')
-                os.chmod(parent_dir, stat.S_IRWXU | stat.S_IRGRP | stat.S_IXGRP | stat.S_IROTH | stat.S_IXOTH)
-                os.chmod(upload_dir, stat.S_IRWXU | stat.S_IRGRP | stat.S_IXGRP | stat.S_IROTH | stat.S_IXOTH)
-            except (OSError, PermissionError):
-                pass  # Ignore permission errors
-        
-        # Log successful directory creation
-        logging.info(f"Created/verified directory: {upload_dir}")
-        
-    except Exception as e:
-        # Log any errors but don't break the upload
-        logging.error(f"Error creating bride additional image directory: {e}")
-    
-    return f'brides/additional/{filename}'
-
 class BrideImage(models.Model):
     """Model for additional bride images"""
     bride = models.ForeignKey(Bride, on_delete=models.CASCADE, related_name='additional_images')
-    image = models.ImageField(upload_to=bride_additional_image_path, help_text="Additional bride photo")
+    image = models.ImageField(upload_to=bride_additional_image_path, storage=image_storage, help_text="Additional bride photo")
+    image_width = models.PositiveIntegerField(null=True, blank=True, editable=False, help_text="Width of the original image once its resized copies exist")
+    image_formats = models.CharField(max_length=50, blank=True, editable=False, help_text="Modern encodings (e.g. avif,webp) written alongside the JPEG copies")
     caption = models.CharField(max_length=200, blank=True, help_text="Optional caption for this image")
     order = models.PositiveIntegerField(default=0, help_text="Display order (0 = first)")
     created_at = models.DateTimeField(auto_now_add=True)
@@ -119,8 +154,20 @@ class BrideImage(models.Model):
     def __str__(self):
         return f"{self.bride.name} - Image {self.id}"
     
+    def get_image_srcset(self):
+        """srcset of the resized copies of this image"""
+        return build_srcset(self.image, self.image_width)
+    
+    def get_image_sources(self):
+        """<picture> sources for the WebP/AVIF copies of this image"""
+        return build_sources(self.image, self.image_width, self.image_formats)
+    
     class Meta:
         ordering = ['order', 'created_at']
+        indexes = [
+            # A bride's images in display order, as prefetched by Bride.with_images()
+            models.Index(fields=['bride', 'order', 'created_at'], name='brideimage_order_idx'),
+        ]
         verbose_name = "Bride Image"
         verbose_name_plural = "Bride Images"
 
@@ -138,6 +185,41 @@ class Customer(models.Model):
     class Meta:
         ordering = ['name']
 
+class InvoiceSequence(models.Model):
+    """Last invoice number handed out for each year (see Invoice.new_invoice_number)"""
+    year = models.PositiveIntegerField(unique=True)
+    last_number = models.PositiveIntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.year}: {self.last_number}"
+    
+    @classmethod
+    def allocate(cls, year, count=1):
+        """
+        Reserve `count` consecutive numbers for the year and return them.
+        The counter row is updated before it is read, so concurrent callers
+        in other workers wait for the lock instead of reading the same value.
+        """
+        with transaction.atomic():
+            updated = cls.objects.filter(year=year).update(last_number=models.F('last_number') + count)
+            if not updated:
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(year=year, last_number=Invoice.highest_number(year) + count)
+                except IntegrityError:
+                    # Another worker created the counter first
+                    cls.objects.filter(year=year).update(last_number=models.F('last_number') + count)
+            last_number = cls.objects.select_for_update().values_list('last_number', flat=True).get(year=year)
+        return list(range(last_number - count + 1, last_number + 1))
+    
+    @classmethod
+    def advance_past(cls, year, number):
+        """Make sure numbers up to `number` are never handed out again, e.g. after an import"""
+        cls.objects.filter(year=year, last_number__lt=number).update(last_number=number)
+    
+    class Meta:
+        ordering = ['year']
+
 class Invoice(models.Model):
     """Model for invoice"""
     PAYMENT_STATUS_CHOICES = [
@@ -173,44 +255,138 @@ class Invoice(models.Model):
         validators=[MinValueValidator(Decimal('0.00'))],
         help_text="Amount paid in advance"
     )
+    # Stored totals, kept in sync with the line items (see signals.py)
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'), editable=False)
+    discount_amount = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'), editable=False)
+    tax_amount = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'), editable=False)
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'), editable=False)
+    due_amount = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'), editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    TOTAL_FIELDS = ['subtotal', 'discount_amount', 'tax_amount', 'total', 'due_amount']
+    
+    NUMBER_PREFIX = 'INV'
+    
+    @classmethod
+    def format_invoice_number(cls, year, number):
+        """Invoice number like INV-2026-000123; zero-padded so they sort in issue order"""
+        return f"{cls.NUMBER_PREFIX}-{year}-{number:06d}"
+    
+    @classmethod
+    def parse_invoice_number(cls, invoice_number):
+        """(year, sequence number) of a generated invoice number, or None for other formats"""
+        prefix, _, rest = (invoice_number or '').partition('-')
+        year, _, number = rest.partition('-')
+        if prefix == cls.NUMBER_PREFIX and len(year) == 4 and year.isdigit() and number.isdigit():
+            return int(year), int(number)
+        return None
+    
+    @classmethod
+    def highest_number(cls, year):
+        """Highest sequence number already used in the year, 0 if none"""
+        # Zero-padded numbers sort numerically, so this is one range scan of the
+        # unique index (':' sorts right after the digits)
+        prefix = f"{cls.NUMBER_PREFIX}-{year}-"
+        last = (cls.objects.filter(invoice_number__gt=prefix, invoice_number__lt=f"{prefix}:")
+                .order_by('-invoice_number').values_list('invoice_number', flat=True).first())
+        parsed = cls.parse_invoice_number(last)
+        return parsed[1] if parsed else 0
+    
+    @classmethod
+    def new_invoice_numbers(cls, year, count):
+        """Allocate `count` consecutive invoice numbers for the year"""
+        return [cls.format_invoice_number(year, number) for number in InvoiceSequence.allocate(year, count)]
+    
+    @classmethod
+    def new_invoice_number(cls, issue_date=None):
+        """Allocate the next invoice number in the issue date's year"""
+        year = (issue_date or timezone.localdate()).year
+        return cls.new_invoice_numbers(year, 1)[0]
+    
     def save(self, *args, **kwargs):
         if not self.invoice_number:
-            # Generate unique invoice number
-            self.invoice_number = f"INV-{uuid.uuid4().hex[:8].upper()}"
+            self.invoice_number = self.new_invoice_number(self.issue_date)
+        # Percentages/advance may have changed, so re-derive the stored totals
+        self.apply_totals(self.calculate_subtotal() if self.pk else Decimal('0.00'))
         super().save(*args, **kwargs)
     
+    def apply_totals(self, subtotal):
+        """Set the stored amounts from a subtotal, applying discount before tax"""
+        subtotal = Decimal(str(subtotal or 0))
+        discount = (subtotal * Decimal(str(self.discount_percentage or 0))) / 100
+        tax = ((subtotal - discount) * Decimal(str(self.tax_percentage or 0))) / 100
+        total = subtotal - discount + tax
+        due = max(total - Decimal(str(self.advance_amount or 0)), Decimal('0.00'))
+        
+        cents = Decimal('0.01')
+        self.subtotal = subtotal.quantize(cents, rounding=ROUND_HALF_UP)
+        self.discount_amount = discount.quantize(cents, rounding=ROUND_HALF_UP)
+        self.tax_amount = tax.quantize(cents, rounding=ROUND_HALF_UP)
+        self.total = total.quantize(cents, rounding=ROUND_HALF_UP)
+        self.due_amount = due.quantize(cents, rounding=ROUND_HALF_UP)
+    
+    def calculate_subtotal(self):
+        """Sum the line items (hits the database)"""
+        return sum((item.get_total() for item in self.items.all()), Decimal('0.00'))
+    
+    def update_totals(self, commit=True):
+        """Recalculate the stored totals from the line items"""
+        self.apply_totals(self.calculate_subtotal())
+        if commit and self.pk:
+            values = {field: getattr(self, field) for field in self.TOTAL_FIELDS}
+            self.updated_at = timezone.now()
+            Invoice.objects.filter(pk=self.pk).update(updated_at=self.updated_at, **values)
+    
     def get_subtotal(self):
-        """Calculate subtotal before tax and discount"""
-        return sum(item.get_total() for item in self.items.all())
+        """Subtotal before tax and discount"""
+        return self.subtotal
     
     def get_discount_amount(self):
-        """Calculate discount amount"""
-        return (self.get_subtotal() * self.discount_percentage) / 100
+        """Discount amount"""
+        return self.discount_amount
     
     def get_tax_amount(self):
-        """Calculate tax amount after discount"""
-        amount_after_discount = self.get_subtotal() - self.get_discount_amount()
-        return (amount_after_discount * self.tax_percentage) / 100
+        """Tax amount after discount"""
+        return self.tax_amount
     
     def get_total(self):
-        """Calculate final total"""
-        subtotal = self.get_subtotal()
-        discount = self.get_discount_amount()
-        tax = self.get_tax_amount()
-        return subtotal - discount + tax
+        """Final total"""
+        return self.total
     
     def get_due_amount(self):
-        """Calculate due amount after advance payment"""
-        return max(self.get_total() - self.advance_amount, Decimal('0.00'))
+        """Due amount after advance payment"""
+        return self.due_amount
     
     def __str__(self):
         return f"{self.invoice_number} - {self.customer.name}"
     
+    @classmethod
+    def for_period(cls, month=None, year=None, queryset=None):
+        """
+        Invoices issued in the given month and/or year; a month without a year
+        matches that month in every year, and no filters match everything
+        """
+        if queryset is None:
+            queryset = cls.objects.all()
+        if year:
+            start, end = period_bounds(year, month)
+            queryset = queryset.filter(issue_date__gte=start, issue_date__lt=end)
+        elif month:
+            # Every year's month cannot be expressed as one range
+            queryset = queryset.filter(issue_date__month=month)
+        return queryset
+    
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # invoice_list (default ordering)
+            models.Index(fields=['-created_at'], name='invoice_created_idx'),
+            # Period filters of the reports and exports, and their -issue_date/issue_date ordering
+            models.Index(fields=['issue_date'], name='invoice_issue_date_idx'),
+            # Exports filtered by status within a period
+            models.Index(fields=['payment_status', 'issue_date'], name='invoice_status_date_idx'),
+        ]
 
 class InvoiceItem(models.Model):
     """Model for invoice line items"""
@@ -232,3 +408,112 @@ class InvoiceItem(models.Model):
     
     class Meta:
         ordering = ['id']
+
+
+class MonthlyRevenueRollup(models.Model):
+    """Pre-aggregated invoice figures per issue month, used by the reports dashboard"""
+    year = models.PositiveIntegerField()
+    month = models.PositiveSmallIntegerField()
+    bookings = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    advance = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    due = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    pending_count = models.PositiveIntegerField(default=0)
+    partially_paid_count = models.PositiveIntegerField(default=0)
+    paid_count = models.PositiveIntegerField(default=0)
+    overdue_count = models.PositiveIntegerField(default=0)
+    cancelled_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    @staticmethod
+    def aggregates():
+        """Aggregate expressions for a queryset of invoices"""
+        figures = {
+            'bookings': models.Count('id'),
+            'revenue': models.Sum('total'),
+            'advance': models.Sum('advance_amount'),
+            'due': models.Sum('due_amount'),
+        }
+        for status, _ in Invoice.PAYMENT_STATUS_CHOICES:
+            figures[f'{status}_count'] = models.Count('id', filter=models.Q(payment_status=status))
+        return figures
+    
+    @classmethod
+    def refresh_month(cls, year, month):
+        """Recompute the rollup row for one month from its invoices"""
+        start, end = period_bounds(year, month)
+        figures = Invoice.objects.filter(
+            issue_date__gte=start, issue_date__lt=end
+        ).aggregate(**cls.aggregates())
+        
+        if not figures['bookings']:
+            cls.objects.filter(year=year, month=month).delete()
+            return None
+        
+        defaults = {key: value or 0 for key, value in figures.items()}
+        rollup, _ = cls.objects.update_or_create(year=year, month=month, defaults=defaults)
+        return rollup
+    
+    @classmethod
+    def rebuild(cls):
+        """Recompute every rollup row from the full invoice history"""
+        from django.db import transaction
+        from django.db.models.functions import TruncMonth
+        
+        rows = (Invoice.objects
+                .annotate(period=TruncMonth('issue_date'))
+                .values('period')
+                .annotate(**cls.aggregates())
+                .order_by('period'))
+        
+        rollups = []
+        for row in rows:
+            period = row.pop('period')
+            rollups.append(cls(
+                year=period.year,
+                month=period.month,
+                **{key: value or 0 for key, value in row.items()}
+            ))
+        
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(rollups)
+        return len(rollups)
+    
+    def __str__(self):
+        return f"{self.year}-{self.month:02d}: {self.bookings} bookings"
+    
+    class Meta:
+        ordering = ['year', 'month']
+        unique_together = ['year', 'month']
+        verbose_name = "Monthly Revenue Rollup"
+        verbose_name_plural = "Monthly Revenue Rollups"
+
+class Job(models.Model):
+    """Background task queued in the database and run by the `run_worker` command"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    
+    task = models.CharField(max_length=100, help_text="Name of a task registered in tasks.py")
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    last_error = models.TextField(blank=True)
+    run_after = models.DateTimeField(default=timezone.now, help_text="Not picked up before this time (used for retry backoff)")
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.task} #{self.pk} ({self.status})"
+    
+    class Meta:
+        ordering = ['run_after', 'id']
+        verbose_name = "Background Job"
+        verbose_name_plural = "Background Jobs"
\ No newline at end of file
@@ -0,0 +1,208 @@
+"""
+PDF rendering of invoices with ReportLab.
+
+Rendered files are cached on disk as ``invoice_<pk>_<version>.pdf`` under
+settings.INVOICE_PDF_ROOT, where the version is the invoice's ``updated_at``.
+Saving the invoice, any of its items or its customer bumps ``updated_at``, so
+an unchanged invoice is rendered once and every later download is a single
+file read.
+"""
+import logging
+import os
+import tempfile
+from io import BytesIO
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+BUSINESS_DETAILS = [
+    'Premium Bridal Makeup',
+    'Paschim Midnapore',
+    'Phone: +91-6290434601',
+    'Email: sksaima821@gmail.com',
+    'Website: www.bridesofsaima.com',
+]
+
+TERMS = [
+    'Advance payment is non-refundable',
+    'Please pay at least 50% of the balance 24 hours before the event.',
+    'Any change in date is chargeable and depends on availability.',
+    'We will post images and reels on our social media. Any objections must be notified in advance.',
+]
+
+INSTAGRAM_QR = Path(__file__).resolve().parent / 'static' / 'BridesOfSaima' / 'images' / 'instaQR.png'
+
+GOLD = '#d4af37'
+DARK = '#2c3e50'
+
+
+def get_pdf_root():
+    """Directory holding the cached invoice PDFs (kept out of MEDIA_ROOT, they are private)"""
+    return Path(getattr(settings, 'INVOICE_PDF_ROOT', settings.BASE_DIR / 'cache' / 'invoices'))
+
+
+def pdf_version(invoice):
+    return invoice.updated_at.strftime('%Y%m%d%H%M%S%f')
+
+
+def pdf_etag(invoice):
+    """Strong ETag of the PDF for the invoice's current version"""
+    return f'"invoice-{invoice.pk}-{pdf_version(invoice)}"'
+
+
+def pdf_path(invoice):
+    return get_pdf_root() / f'invoice_{invoice.pk}_{pdf_version(invoice)}.pdf'
+
+
+def money(value):
+    # The standard PDF fonts have no rupee sign
+    return f'Rs. {value:,.2f}'
+
+
+def render_invoice_pdf(invoice):
+    """Render an invoice to PDF and return the bytes"""
+    from reportlab.lib import colors
+    from reportlab.lib.enums import TA_CENTER, TA_RIGHT
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+    from reportlab.lib.units import mm
+    from reportlab.platypus import Image, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+    from xml.sax.saxutils import escape
+
+    styles = getSampleStyleSheet()
+    normal = styles['Normal']
+    heading = ParagraphStyle('Heading', parent=styles['Heading4'], textColor=colors.HexColor(GOLD), spaceAfter=4)
+    right = ParagraphStyle('Right', parent=normal, alignment=TA_RIGHT)
+    centered = ParagraphStyle('Centered', parent=normal, alignment=TA_CENTER)
+    company = ParagraphStyle('Company', parent=styles['Title'], alignment=0, textColor=colors.HexColor(DARK))
+    number = ParagraphStyle('Number', parent=styles['Heading2'], alignment=TA_RIGHT, textColor=colors.HexColor(DARK))
+
+    def lines(values):
+        return Paragraph('<br/>'.join(escape(str(value)) for value in values if value), normal)
+
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(
+        buffer, pagesize=A4, leftMargin=15 * mm, rightMargin=15 * mm, topMargin=15 * mm, bottomMargin=15 * mm,
+        title=f'Invoice {invoice.invoice_number}', author='Brides of Saima',
+    )
+    width = doc.width
+    story = []
+
+    # Header: business on the left, invoice number and status on the right
+    header = Table([[
+        [Paragraph('Brides of Saima', company), lines(BUSINESS_DETAILS)],
+        [Paragraph('INVOICE', number), Paragraph(escape(invoice.invoice_number), number),
+         Paragraph(f'<b>{escape(invoice.get_payment_status_display().upper())}</b>', right)],
+    ]], colWidths=[width * 0.6, width * 0.4])
+    header.setStyle(TableStyle([
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('LINEBELOW', (0, 0), (-1, 0), 2, colors.HexColor(GOLD)),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
+    ]))
+    story += [header, Spacer(1, 8 * mm)]
+
+    customer = invoice.customer
+    details = Table([
+        ['Issue Date:', invoice.issue_date.strftime('%B %d, %Y')],
+        ['Due Date:', invoice.due_date.strftime('%B %d, %Y')],
+    ])
+    parties = Table([[
+        [Paragraph('BILL TO:', heading), lines([customer.name, customer.email, customer.phone, customer.address])],
+        [Paragraph('INVOICE DETAILS:', heading), details],
+    ]], colWidths=[width * 0.5, width * 0.5])
+    parties.setStyle(TableStyle([('VALIGN', (0, 0), (-1, -1), 'TOP')]))
+    story += [parties, Spacer(1, 6 * mm)]
+
+    # Line items
+    rows = [['Description', 'Quantity', 'Unit Price', 'Total']]
+    for item in invoice.items.all():
+        rows.append([Paragraph(escape(item.description), normal), str(item.quantity),
+                     money(item.unit_price), money(item.get_total())])
+    if len(rows) == 1:
+        rows.append(['No items found', '', '', ''])
+    items = Table(rows, colWidths=[width * 0.5, width * 0.15, width * 0.175, width * 0.175], repeatRows=1)
+    items.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor(DARK)),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('ALIGN', (1, 0), (1, -1), 'CENTER'),
+        ('ALIGN', (2, 0), (-1, -1), 'RIGHT'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#dee2e6')),
+    ]))
+    story += [items, Spacer(1, 6 * mm)]
+
+    # Payment summary
+    summary = [['Subtotal:', money(invoice.subtotal)]]
+    if invoice.discount_percentage > 0:
+        summary.append([f'Discount ({invoice.discount_percentage}%):', f'-{money(invoice.discount_amount)}'])
+    if invoice.tax_percentage > 0:
+        summary.append([f'Tax ({invoice.tax_percentage}%):', money(invoice.tax_amount)])
+    summary.append(['Total:', money(invoice.total)])
+    if invoice.advance_amount > 0:
+        summary.append(['Advance Paid:', money(invoice.advance_amount)])
+        summary.append(['Due Amount:', money(invoice.due_amount)])
+    totals = Table(summary, colWidths=[width * 0.25, width * 0.2], hAlign='RIGHT')
+    total_row = len(summary) - 3 if invoice.advance_amount > 0 else len(summary) - 1
+    totals_style = [
+        ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+        ('FONTNAME', (0, total_row), (-1, total_row), 'Helvetica-Bold'),
+        ('LINEABOVE', (0, total_row), (-1, total_row), 1, colors.HexColor(DARK)),
+    ]
+    if invoice.advance_amount > 0:
+        totals_style += [
+            ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor(DARK)),
+            ('TEXTCOLOR', (0, -1), (-1, -1), colors.white),
+            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+        ]
+    totals.setStyle(TableStyle(totals_style))
+    story += [totals, Spacer(1, 6 * mm)]
+
+    if invoice.notes:
+        story += [Paragraph('NOTES:', heading), lines(invoice.notes.splitlines()), Spacer(1, 6 * mm)]
+
+    story.append(Paragraph('Terms &amp; Conditions', heading))
+    story += [Paragraph(f'&bull; <b>{escape(term)}</b>', normal) for term in TERMS]
+    story += [
+        Spacer(1, 8 * mm),
+        Paragraph('<b>Thank You!</b>', centered),
+        Paragraph('For any questions regarding this invoice, please contact us at '
+                  'sksaima821@gmail.com or +91-6290434601', centered),
+    ]
+    if INSTAGRAM_QR.exists():
+        story += [Spacer(1, 4 * mm), Image(str(INSTAGRAM_QR), width=30 * mm, height=30 * mm),
+                  Paragraph('@bridesofsaima', centered)]
+
+    doc.build(story)
+    return buffer.getvalue()
+
+
+def get_invoice_pdf(invoice):
+    """Path of the cached PDF for the invoice's current version, rendering it first if needed"""
+    path = pdf_path(invoice)
+    if path.exists():
+        return path
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = render_invoice_pdf(invoice)
+    # Write to a temporary name first so a concurrent download never reads half a file
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as temp_file:
+        temp_file.write(data)
+    os.replace(temp_path, path)
+
+    # Earlier versions of this invoice are never served again
+    delete_cached_pdfs(invoice.pk, keep=path)
+    return path
+
+
+def delete_cached_pdfs(pk, keep=None):
+    """Remove the cached PDFs of an invoice, except `keep`"""
+    for cached in get_pdf_root().glob(f'invoice_{pk}_*.pdf'):
+        if cached != keep:
+            try:
+                cached.unlink()
+            except OSError as e:
+                logger.warning(f"Could not delete cached PDF {cached}: {e}")
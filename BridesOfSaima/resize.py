@@ -0,0 +1,189 @@
+"""
+Resized and cropped copies of bride photos, made on first request.
+
+``/media/resize/<width>x<height>/<name>`` serves the image `name` of a Bride
+or BrideImage scaled to fit the box, and cropped to fill it when both sides
+are given; 0 leaves that side proportional. Images are never enlarged.
+Sizes in settings.IMAGE_RESIZE_SIZES are open to anyone, any other size needs
+the HMAC signature that resized_url() adds, so the endpoint cannot be made to
+render arbitrary sizes.
+
+Copies are written once under settings.IMAGE_RESIZE_ROOT and served from
+disk afterwards. Hits refresh a copy's mtime, and sweep_cache() removes the
+least recently used copies once the cache is larger than
+settings.IMAGE_RESIZE_CACHE_SIZE. The sweep is queued as a job whenever new
+copies are written, and can be run with ``python manage.py sweep_resize_cache``.
+"""
+import logging
+import os
+import tempfile
+import time
+from io import BytesIO
+from pathlib import Path
+from urllib.parse import quote
+
+from django.conf import settings
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+from .images import DEFAULT_QUALITY
+from .jobs import enqueue
+from .storage import image_storage
+
+logger = logging.getLogger(__name__)
+
+# (width, height) pairs that need no signature; 0 keeps that side proportional
+DEFAULT_SIZES = {(320, 0), (640, 0), (1280, 0), (300, 300), (600, 600)}
+
+DEFAULT_CACHE_SIZE = 500 * 1024 * 1024
+
+# Largest side accepted even with a valid signature
+MAX_EDGE = 4000
+
+# A hit refreshes the copy's mtime at most this often (seconds)
+TOUCH_INTERVAL = 60 * 60
+
+# Sweeps delete down to this fraction of the cache size, so the next few
+# copies do not trigger another sweep
+SWEEP_TARGET = 0.9
+
+
+def get_resize_root():
+    return Path(getattr(settings, 'IMAGE_RESIZE_ROOT', Path(settings.BASE_DIR) / 'cache' / 'resized'))
+
+
+def get_sizes():
+    """Unsigned sizes, overridable with settings.IMAGE_RESIZE_SIZES"""
+    return {tuple(size) for size in getattr(settings, 'IMAGE_RESIZE_SIZES', DEFAULT_SIZES)}
+
+
+def signature(name, width, height):
+    return salted_hmac('BridesOfSaima.resize', f'{width}x{height}/{name}').hexdigest()[:16]
+
+
+def is_allowed(name, width, height, sig=''):
+    """Whether the size may be rendered: whitelisted or correctly signed"""
+    if not (width or height) or max(width, height) > MAX_EDGE:
+        return False
+    return (width, height) in get_sizes() or constant_time_compare(sig, signature(name, width, height))
+
+
+def resized_url(name, width, height):
+    """URL of `name` resized to `width` x `height`, signed when the size is not whitelisted"""
+    url = f'{settings.MEDIA_URL}resize/{width}x{height}/{quote(name)}'
+    if (width, height) not in get_sizes():
+        url += f'?sig={signature(name, width, height)}'
+    return url
+
+
+def is_bride_image(name):
+    """Whether `name` is the stored image of a Bride or BrideImage"""
+    from .models import Bride, BrideImage
+
+    return Bride.objects.filter(image=name).exists() or BrideImage.objects.filter(image=name).exists()
+
+
+def cache_path(name, width, height):
+    return get_resize_root() / f'{width}x{height}' / name
+
+
+def get_resized(name, width, height):
+    """Path of the cached copy of `name` at the given size, rendering it first if needed"""
+    path = cache_path(name, width, height)
+    try:
+        mtime = path.stat().st_mtime
+    except FileNotFoundError:
+        pass
+    else:
+        # Record the hit for the LRU sweep without rewriting metadata on every request
+        if time.time() - mtime > TOUCH_INTERVAL:
+            os.utime(path)
+        return path
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with image_storage.open(name, 'rb') as source:
+        data = render(source, width, height)
+    # Write to a temporary name first so a concurrent request never reads half a file
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as temp_file:
+        temp_file.write(data)
+    os.replace(temp_path, path)
+    enqueue('sweep_resize_cache', unique=True)
+    return path
+
+
+def render(source, width, height):
+    """Encoded bytes of the image in `source` resized to the box, in its original format"""
+    from PIL import Image, ImageOps
+
+    with Image.open(source) as original:
+        original.load()
+        image_format = original.format
+        image = ImageOps.exif_transpose(original)
+
+    if width and height:
+        # Shrink the box to fit inside the image, keeping its aspect ratio
+        scale = min(1, image.width / width, image.height / height)
+        image = ImageOps.fit(image, (max(1, round(width * scale)), max(1, round(height * scale))), Image.LANCZOS)
+    else:
+        image.thumbnail((width or image.width, height or image.height), Image.LANCZOS)
+
+    buffer = BytesIO()
+    if image_format == 'JPEG':
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        quality = getattr(settings, 'BRIDE_IMAGE_QUALITY', DEFAULT_QUALITY)
+        image.save(buffer, 'JPEG', quality=quality, optimize=True, progressive=True)
+    else:
+        image.save(buffer, image_format)
+    return buffer.getvalue()
+
+
+def delete_resized(name):
+    """Remove the cached copies of `name` at every size"""
+    root = get_resize_root()
+    if not root.is_dir():
+        return
+    for size_dir in root.iterdir():
+        try:
+            (size_dir / name).unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning(f"Could not delete resized copy {size_dir / name}: {e}")
+
+
+def sweep_cache(max_size=None):
+    """
+    Delete the least recently used copies until the cache is below
+    SWEEP_TARGET of `max_size` (settings.IMAGE_RESIZE_CACHE_SIZE).
+    Returns the number of files removed.
+    """
+    if max_size is None:
+        max_size = getattr(settings, 'IMAGE_RESIZE_CACHE_SIZE', DEFAULT_CACHE_SIZE)
+
+    entries = []
+    for directory, _, filenames in os.walk(get_resize_root()):
+        for filename in filenames:
+            if filename.endswith('.tmp'):
+                continue  # Being written
+            path = os.path.join(directory, filename)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    if total <= max_size:
+        return 0
+
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= max_size * SWEEP_TARGET:
+            break
+        try:
+            os.remove(path)
+            removed += 1
+        except FileNotFoundError:
+            pass
+        total -= size
+    logger.info(f"Removed {removed} resized images, {total} bytes left")
+    return removed
@@ -0,0 +1,74 @@
+"""
+Full-text search over customers, invoices and brides with SQLite FTS5.
+
+The ``*_fts`` tables are created by migration 0014 and kept in sync by
+triggers on the model tables, so rows written with bulk_create() are indexed
+as well. Each FTS row id is the primary key of the row it indexes:
+
+    customers: name, email, phone, address
+    invoices:  invoice number, notes, line item descriptions
+    brides:    name, location, tagline
+
+Every word of a query must match the start of a word in the row, so "pri
+mid" finds "Priya, Midnapore" and "9000" finds a phone number.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Bride, Customer, Invoice
+
+SEARCH_TABLES = {
+    Customer: 'BridesOfSaima_customer_fts',
+    Invoice: 'BridesOfSaima_invoice_fts',
+    Bride: 'BridesOfSaima_bride_fts',
+}
+
+# Results per model returned by search()
+SEARCH_LIMIT = 20
+
+
+def fts_query(text):
+    """FTS5 MATCH expression requiring a prefix match for every word of `text`"""
+    # Quoting each word keeps FTS5 operators and punctuation in user input literal
+    return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', text.lower()))
+
+
+def match(model, text, field='pk'):
+    """
+    Q object keeping rows whose `field` (a primary key or foreign key to
+    `model`) points to a row matching `text`. Matches nothing for an empty query.
+    """
+    query = fts_query(text)
+    if not query:
+        return Q(pk__in=[])
+    table = SEARCH_TABLES[model]
+    return Q(**{f'{field}__in': RawSQL(f'SELECT rowid FROM {table} WHERE {table} MATCH %s', [query])})
+
+
+def ranked_ids(model, text, limit=SEARCH_LIMIT):
+    """Primary keys of the best matches for `text`, best first (bm25)"""
+    query = fts_query(text)
+    if not query:
+        return []
+    table = SEARCH_TABLES[model]
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT rowid FROM {table} WHERE {table} MATCH %s ORDER BY rank LIMIT %s', [query, limit])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def search(text, limit=SEARCH_LIMIT):
+    """Best matching customers, invoices and brides, each list ordered by relevance"""
+    querysets = {
+        'customers': Customer.objects.all(),
+        'invoices': Invoice.objects.select_related('customer'),
+        'brides': Bride.objects.all(),
+    }
+    results = {}
+    for key, queryset in querysets.items():
+        ids = ranked_ids(queryset.model, text, limit)
+        objects = queryset.in_bulk(ids)
+        results[key] = [objects[pk] for pk in ids if pk in objects]
+    return results
@@ -0,0 +1,156 @@
+"""
+File responses for the static and media views.
+
+serve_file() answers If-None-Match/If-Modified-Since with 304s and a single
+byte range (``Range: bytes=...``) with a 206. Full files are handed to the
+WSGI server's file wrapper, which uses sendfile() where it can.
+
+With settings.MEDIA_SENDFILE set, Django never reads the file: after the
+checks it returns an empty response carrying X-Sendfile (Apache
+mod_xsendfile, lighttpd) or X-Accel-Redirect (nginx), and the front-end
+server sends the file itself, range requests included. For nginx,
+settings.MEDIA_ACCEL_REDIRECT_URL must be an ``internal`` location aliased
+to MEDIA_ROOT.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+# Bytes read per iteration when Django sends a byte range itself
+CHUNK_SIZE = 64 * 1024
+
+SENDFILE_HEADERS = {
+    'x-sendfile': 'X-Sendfile',
+    'x-accel-redirect': 'X-Accel-Redirect',
+}
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeFile:
+    """Read-only view of `length` bytes of an open file, starting at `start`"""
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def resolve_path(root, name):
+    """Absolute path of file `name` inside `root`, or Http404"""
+    try:
+        path = safe_join(root, name)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(path):
+        raise Http404
+    return path
+
+
+def file_etag(stat):
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def parse_range(header, size):
+    """
+    (first, last) byte positions requested by a Range header, or None to send
+    the whole file: no header, a syntax we ignore, or several ranges.
+    Raises ValueError when the range lies outside the file.
+    """
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if not match or match.group(1) == match.group(2) == '':
+        return None
+    first, last = match.groups()
+    if first == '':
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError(header)
+        return max(0, size - length), size - 1
+    first = int(first)
+    last = min(int(last), size - 1) if last else size - 1
+    if first >= size or first > last:
+        raise ValueError(header)
+    return first, last
+
+
+def range_applies(request, etag, last_modified):
+    """False when If-Range names a version other than the current one"""
+    if_range = request.headers.get('If-Range')
+    return not if_range or if_range in (etag, http_date(last_modified))
+
+
+def serve_file(request, path, content_type=None, encoding=None, cache_control=None, sendfile_url=None):
+    """
+    Response for the file at `path`. `cache_control` holds patch_cache_control()
+    arguments; `sendfile_url` is the file's URL under MEDIA_ACCEL_REDIRECT_URL
+    and enables the X-Sendfile/X-Accel-Redirect hand-off.
+    """
+    stat = os.stat(path)
+    etag = file_etag(stat)
+    last_modified = int(stat.st_mtime)
+    content_type = content_type or mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        sendfile = getattr(settings, 'MEDIA_SENDFILE', None) if sendfile_url else None
+        if sendfile:
+            response = HttpResponse(content_type=content_type)
+            response[SENDFILE_HEADERS[sendfile]] = path if sendfile == 'x-sendfile' else sendfile_url
+        else:
+            response = file_response(request, path, stat, content_type, etag, last_modified)
+        if encoding:
+            response['Content-Encoding'] = encoding
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    if cache_control:
+        patch_cache_control(response, **cache_control)
+    return response
+
+
+def file_response(request, path, stat, content_type, etag, last_modified):
+    """The whole file, or the requested byte range of it"""
+    size = stat.st_size
+    byte_range = None
+    if request.method == 'GET' and 'Range' in request.headers and range_applies(request, etag, last_modified):
+        try:
+            byte_range = parse_range(request.headers['Range'], size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    if byte_range is None:
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+    else:
+        first, last = byte_range
+        response = FileResponse(RangeFile(open(path, 'rb'), first, last - first + 1), content_type=content_type, status=206)
+        response['Content-Length'] = last - first + 1
+        response['Content-Range'] = f'bytes {first}-{last}/{size}'
+    response.block_size = CHUNK_SIZE
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def sendfile_url(name):
+    """URL of media file `name` under the front-end server's internal location"""
+    return getattr(settings, 'MEDIA_ACCEL_REDIRECT_URL', '/protected-media/') + quote(name)
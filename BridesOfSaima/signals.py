@@ -0,0 +1,181 @@
+import logging
+import threading
+from contextlib import contextmanager
+
+from django.db.models import QuerySet
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils import timezone
+from .caching import invalidate_bride, invalidate_gallery
+from .images import copy_processed_state, normalize_upload, release_image
+from .jobs import enqueue
+from .pdf import delete_cached_pdfs
+from .models import Customer, Invoice, InvoiceItem, MonthlyRevenueRollup, Bride, BrideImage
+
+logger = logging.getLogger(__name__)
+
+# Invoices whose item changes are being batched by deferred_invoice_totals()
+_deferred_totals = threading.local()
+
+def refresh_rollup(issue_date):
+    """Recompute the monthly rollup covering an issue date"""
+    if issue_date:
+        MonthlyRevenueRollup.refresh_month(issue_date.year, issue_date.month)
+
+
+def invalidate_pages_after_commit(bride_id, reordered=False):
+    """Drop a bride's cached pages once the change is visible to other requests"""
+    def invalidate():
+        invalidate_bride(bride_id)
+        if reordered:
+            invalidate_gallery()
+    transaction.on_commit(invalidate)
+
+
+def release_after_commit(storage, name, original_width):
+    """Reference-counted file cleanup, deferred so a rollback never loses a file"""
+    transaction.on_commit(lambda: release_image(storage, name, original_width))
+
+
+def deferred_invoice_ids():
+    """Set of invoice pks whose totals are recomputed at the end of a batch in this thread"""
+    return _deferred_totals.__dict__.setdefault('invoice_ids', set())
+
+
+@contextmanager
+def deferred_invoice_totals(invoice):
+    """
+    Recompute an invoice's totals and rollup once after a batch of item
+    changes, such as a formset save, instead of once per item
+    """
+    invoice_ids = deferred_invoice_ids()
+    invoice_ids.add(invoice.pk)
+    try:
+        yield
+    finally:
+        invoice_ids.discard(invoice.pk)
+    invoice.update_totals()
+    refresh_rollup(invoice.issue_date)
+
+
+@receiver(post_save, sender=InvoiceItem)
+@receiver(post_delete, sender=InvoiceItem)
+def update_invoice_totals(sender, instance, **kwargs):
+    """Keep the invoice's stored totals in sync with its line items"""
+    origin = kwargs.get('origin')
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if origin is not None and origin_model is not InvoiceItem:
+        return  # Cascade from an invoice or customer delete: the invoice goes too
+    if instance.invoice_id in deferred_invoice_ids():
+        return
+    invoice = Invoice.objects.filter(pk=instance.invoice_id).first()
+    if invoice is not None:
+        invoice.update_totals()
+        refresh_rollup(invoice.issue_date)
+
+
+@receiver(post_save, sender=Customer)
+def touch_customer_invoices(sender, instance, created, **kwargs):
+    """Bump updated_at on the customer's invoices, which print their name and contact details"""
+    if not created:
+        # update() sends no signals: the totals and rollups are unaffected
+        Invoice.objects.filter(customer=instance).update(updated_at=timezone.now())
+
+
+@receiver(pre_save, sender=Invoice)
+def remember_previous_issue_date(sender, instance, **kwargs):
+    """Note the stored issue date so a moved invoice also updates its old month"""
+    instance._previous_issue_date = None
+    if instance.pk:
+        instance._previous_issue_date = (
+            Invoice.objects.filter(pk=instance.pk).values_list('issue_date', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Invoice)
+@receiver(post_delete, sender=Invoice)
+def update_monthly_rollup(sender, instance, **kwargs):
+    """Keep the monthly revenue rollups in sync with invoice changes"""
+    refresh_rollup(instance.issue_date)
+    previous = getattr(instance, '_previous_issue_date', None)
+    if previous and (previous.year, previous.month) != (instance.issue_date.year, instance.issue_date.month):
+        refresh_rollup(previous)
+
+
+@receiver(pre_save, sender=Bride)
+@receiver(pre_save, sender=BrideImage)
+def normalize_new_image(sender, instance, **kwargs):
+    """Rotate, strip and re-encode a newly uploaded photo before it is hashed and stored"""
+    if instance.image and not instance.image._committed:
+        try:
+            instance.image = normalize_upload(instance.image.file)
+        except Exception as e:
+            logger.warning(f"Could not normalise uploaded image {instance.image.name}, stored as is: {e}")
+
+
+@receiver(pre_save, sender=Bride)
+@receiver(pre_save, sender=BrideImage)
+def reset_image_width(sender, instance, **kwargs):
+    """Forget the processed width when a new file replaces the image"""
+    instance._previous_image = None
+    if instance.pk:
+        stored = sender.objects.filter(pk=instance.pk).values('image', 'image_width').first()
+        if stored and stored['image'] != instance.image.name:
+            instance._previous_image = stored
+            instance.image_width = None
+
+
+@receiver(post_save, sender=Bride)
+@receiver(post_save, sender=BrideImage)
+def queue_image_derivatives(sender, instance, **kwargs):
+    """Queue the resized copies of a newly uploaded image so the upload returns immediately"""
+    previous = getattr(instance, '_previous_image', None)
+    if previous:
+        release_after_commit(instance.image.storage, previous['image'], previous['image_width'])
+    
+    if instance.image and instance.image_width is None:
+        # A photo already uploaded elsewhere shares its file and derivatives
+        if not copy_processed_state(instance):
+            enqueue('generate_image_derivatives', unique=True, model=sender.__name__, pk=instance.pk)
+
+
+@receiver(post_delete, sender=Bride)
+@receiver(post_delete, sender=BrideImage)
+def release_deleted_image(sender, instance, **kwargs):
+    """Delete the stored photo once no other row references it"""
+    if instance.image:
+        release_after_commit(instance.image.storage, instance.image.name, instance.image_width)
+
+
+@receiver(post_delete, sender=Invoice)
+def delete_invoice_pdfs(sender, instance, **kwargs):
+    """Remove the cached PDFs of a deleted invoice once the deletion commits"""
+    pk = instance.pk
+    transaction.on_commit(lambda: delete_cached_pdfs(pk))
+
+
+@receiver(pre_save, sender=Bride)
+def remember_previous_event_date(sender, instance, **kwargs):
+    """Note the stored event date, which decides the bride's place in the gallery"""
+    instance._previous_event_date = None
+    if instance.pk:
+        instance._previous_event_date = (
+            Bride.objects.filter(pk=instance.pk).values_list('event_date', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Bride)
+@receiver(post_delete, sender=Bride)
+def invalidate_bride_cache(sender, instance, **kwargs):
+    """Drop the cached pages showing this bride; new, deleted or re-dated brides reorder the gallery"""
+    # post_delete sends no `created`, and a removal always reorders
+    reordered = kwargs.get('created', True) or instance._previous_event_date != instance.event_date
+    invalidate_pages_after_commit(instance.pk, reordered)
+
+
+@receiver(post_save, sender=BrideImage)
+@receiver(post_delete, sender=BrideImage)
+def invalidate_bride_image_cache(sender, instance, **kwargs):
+    """Drop the cached pages of the bride an additional image belongs to"""
+    invalidate_pages_after_commit(instance.bride_id)
@@ -0,0 +1,202 @@
+import gzip
+import logging
+import os
+import posixpath
+import re
+from fnmatch import fnmatch
+from types import SimpleNamespace
+from urllib.parse import urldefrag
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+from django.utils.functional import cached_property
+
+# Text formats worth precompressing; images and woff2 fonts are compressed already
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.map', '.svg', '.json', '.txt', '.md', '.ttf', '.eot', '.ico', '.xml'}
+
+# Suffixes of the precompressed variants by Content-Encoding, in order of preference
+STATIC_ENCODINGS = {'br': '.br', 'gzip': '.gz'}
+
+# Raster images re-encoded by collectstatic (see images.optimize_static_image)
+OPTIMIZED_IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png'}
+
+# Largest size in bytes of a collected file, by glob pattern; first match wins
+DEFAULT_SIZE_BUDGETS = {
+    'BridesOfSaima/images/*': 512 * 1024,
+    'BridesOfSaima/css/*': 32 * 1024,
+}
+
+logger = logging.getLogger(__name__)
+
+
+def get_precompressed_url():
+    """URL prefix routed to Django for text assets (settings.STATIC_PRECOMPRESSED_URL), or None"""
+    return getattr(settings, 'STATIC_PRECOMPRESSED_URL', None)
+
+
+def is_compressible(name):
+    return os.path.splitext(name)[1].lower() in COMPRESSIBLE_EXTENSIONS
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File storage for uploads named after their content hash (see
+    sharded_upload_path). Saving content whose name already exists keeps the
+    stored file instead of writing a suffixed copy, so identical photos are
+    stored once and shared by every row that references them.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name and self.exists(name):
+            return name
+        return super().save(name, content, max_length=max_length)
+
+
+image_storage = ContentAddressedStorage()
+
+
+class PrecompressedManifestStorage(ManifestStaticFilesStorage):
+    """
+    Static files storage writing content-hashed names (see
+    ManifestStaticFilesStorage) plus brotli and gzip variants of every hashed
+    text file, ``<name>.br`` and ``<name>.gz``, at collectstatic time. The
+    static_asset view serves the variant the browser accepts.
+
+    JPEG and PNG images are re-encoded before hashing, with a WebP twin when
+    that is smaller, and collectstatic fails when a file exceeds its size
+    budget (settings.STATIC_SIZE_BUDGETS).
+
+    With settings.STATIC_PRECOMPRESSED_URL set, text assets are linked under
+    that prefix, which is routed to the static_asset view, while every other
+    file stays under STATIC_URL for the front-end server to send.
+    """
+
+    def url(self, name, force=False):
+        url = super().url(name, force)
+        prefix = get_precompressed_url()
+        if prefix and is_compressible(name) and url.startswith(self.base_url):
+            url = prefix + url[len(self.base_url):]
+        return url
+
+    def url_converter(self, name, hashed_files, template=None):
+        """
+        Relative url()s in a stylesheet linked under STATIC_PRECOMPRESSED_URL
+        would resolve under that prefix too, so references to images and
+        fonts are made absolute STATIC_URL paths before they are hashed.
+        """
+        convert = super().url_converter(name, hashed_files, template)
+        if not get_precompressed_url():
+            return convert
+
+        def converter(matchobj):
+            matches = matchobj.groupdict()
+            url_path, _ = urldefrag(matches['url'])
+            if (not url_path or url_path.startswith('/') or re.match(r'^[a-z]+:', url_path)
+                    or is_compressible(url_path)):
+                return convert(matchobj)
+            source_dir = posixpath.dirname(name.replace(os.sep, '/'))
+            matches['url'] = settings.STATIC_URL + posixpath.normpath(posixpath.join(source_dir, matches['url']))
+            # The converter only reads groupdict()
+            return convert(SimpleNamespace(groupdict=lambda: matches))
+        return converter
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            paths = dict(paths)
+            for name in sorted(paths):
+                if os.path.splitext(name)[1].lower() in OPTIMIZED_IMAGE_EXTENSIONS:
+                    paths.update(self.optimize_image(name, *paths[name]))
+
+        hashed_names = {}
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                hashed_names[hashed_name] = name
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        for hashed_name in sorted(hashed_names):
+            if os.path.splitext(hashed_name)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+                self.compress(hashed_name)
+
+        over_budget = self.over_budget(hashed_names)
+        if over_budget:
+            details = ', '.join(f'{name} is {size} bytes (budget {budget})' for name, size, budget in over_budget)
+            yield over_budget[0][0], None, ValueError(f'Static files over their size budget: {details}')
+
+    @cached_property
+    def hashed_names(self):
+        """Every content-hashed name in the manifest, for lookups on each static request"""
+        return frozenset(self.hashed_files.values())
+
+    def write(self, name, content):
+        """Replace the collected file `name` with `content`"""
+        path = self.path(name)
+        # collectstatic --link leaves symlinks to the source files, which must not be modified
+        if os.path.islink(path):
+            os.remove(path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(content)
+
+    def optimize_image(self, name, storage, path):
+        """
+        Re-encode the collected copy of an image and write its WebP twin.
+        Returns the `paths` entries to hash in place of the source file.
+        """
+        from .images import optimize_static_image, webp_twin_name
+
+        # Always start from the source, so running collectstatic again does not degrade the image
+        with storage.open(path) as f:
+            content = f.read()
+        try:
+            optimized, webp = optimize_static_image(content, name)
+        except Exception as e:
+            logger.warning(f"Could not optimise {name}, collected as is: {e}")
+            return {}
+
+        entries = {}
+        size = len(content)
+        if optimized:
+            self.write(name, optimized)
+            size = len(optimized)
+            entries[name] = (self, name)
+        message = f"Optimised {name}: {len(content)} -> {size} bytes, {len(content) - size} saved"
+        if webp:
+            self.write(webp_twin_name(name), webp)
+            entries[webp_twin_name(name)] = (self, webp_twin_name(name))
+            message += f", WebP twin {len(webp)} bytes"
+        logger.info(message)
+        return entries
+
+    def over_budget(self, hashed_names):
+        """(name, size, budget) of the collected files larger than their size budget"""
+        budgets = getattr(settings, 'STATIC_SIZE_BUDGETS', DEFAULT_SIZE_BUDGETS)
+        over = []
+        for hashed_name, name in sorted(hashed_names.items(), key=lambda item: item[1]):
+            budget = next((limit for pattern, limit in budgets.items() if fnmatch(name, pattern)), None)
+            size = self.size(hashed_name)
+            if budget is not None and size > budget:
+                over.append((name, size, budget))
+        return over
+
+    def compress(self, name):
+        """Write the precompressed variants of `name` that are worth keeping"""
+        import brotli
+
+        with self.open(name) as f:
+            content = f.read()
+        variants = {
+            'br': brotli.compress(content, quality=11),
+            'gzip': gzip.compress(content, compresslevel=9, mtime=0),
+        }
+        for encoding, compressed in variants.items():
+            path = self.path(name + STATIC_ENCODINGS[encoding])
+            # Saving under 5% is not worth the extra file
+            if len(compressed) < len(content) * 0.95:
+                with open(path, 'wb') as f:
+                    f.write(compressed)
+            elif os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,26 @@
+"""
+Background tasks run by the job queue (see jobs.py).
+"""
+from django.apps import apps
+
+from .caching import invalidate_bride
+from .images import process_image
+from .jobs import task
+from .resize import sweep_cache
+
+
+@task('generate_image_derivatives')
+def generate_image_derivatives(model, pk):
+    """Create the resized/re-encoded copies of a Bride or BrideImage photo"""
+    instance = apps.get_model('BridesOfSaima', model).objects.filter(pk=pk).first()
+    if instance is None or not instance.image:
+        return  # Deleted or cleared since the job was queued
+    process_image(instance, fail_silently=False)
+    # Cached pages still point at the original only
+    invalidate_bride(pk if model == 'Bride' else instance.bride_id)
+
+
+@task('sweep_resize_cache')
+def sweep_resize_cache():
+    """Trim the on-request resize cache to its size limit"""
+    sweep_cache()
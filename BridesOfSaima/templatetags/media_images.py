@@ -0,0 +1,18 @@
+"""
+Template tags for bride photos resized on request (see resize.py).
+"""
+from django import template
+
+from .. import resize
+
+register = template.Library()
+
+
+@register.simple_tag
+def resized_url(image, width, height):
+    """
+    URL of an image field (or stored name) resized to `width` x `height`,
+    e.g. {% resized_url bride.image 600 600 %}
+    """
+    name = getattr(image, 'name', image)
+    return resize.resized_url(name, width, height) if name else ''
@@ -0,0 +1,20 @@
+"""
+Template tags for the WebP twins that collectstatic writes next to static
+JPEG and PNG images (see storage.PrecompressedManifestStorage).
+"""
+from django import template
+from django.contrib.staticfiles.storage import staticfiles_storage
+
+from ..images import webp_twin_name
+
+register = template.Library()
+
+
+@register.simple_tag
+def static_webp(path):
+    """URL of the WebP twin of static image `path`, or '' when collectstatic did not write one"""
+    twin = webp_twin_name(path)
+    # Only the manifest storage knows about twins; the development server serves sources
+    if twin not in getattr(staticfiles_storage, 'hashed_files', {}):
+        return ''
+    return staticfiles_storage.url(twin)
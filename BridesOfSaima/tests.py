@@ -1,3 +1,786 @@
-from django.test import TestCase
+import io
+import os
+import tempfile
+import threading
+import time
+import unittest
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from importlib import import_module
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections
+from django.http import Http404
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from .caching import get_page_cache
+from .exports import render_invoice, stream_invoice_pdfs
+from .images import derivative_name, estimate_jpeg_quality, normalize_upload
+from .forms import InvoiceForm, InvoiceItemForm
+from .imports import RowValidator, import_bookings
+from .models import Bride, BrideImage, Customer, Invoice, InvoiceItem, InvoiceSequence, MonthlyRevenueRollup
+from .pdf import pdf_etag
+from .resize import MAX_EDGE, cache_path, get_resize_root, get_resized, resized_url, signature, sweep_cache
+from .serving import resolve_path, serve_file
+from .storage import image_storage
+from .views import encode_bride_cursor, get_bride_page
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'Query plans are checked on SQLite')
+class QueryPlanTests(TestCase):
+    """The hot queries must be answered from an index (EXPLAIN QUERY PLAN)"""
+
+    def assertUsesIndex(self, queryset, index):
+        plan = queryset.explain()
+        self.assertIn(f'INDEX {index}', plan)
+        self.assertNotIn('USE TEMP B-TREE FOR ORDER BY', plan)
+
+    def test_invoice_list(self):
+        self.assertUsesIndex(Invoice.objects.select_related('customer')[:50], 'invoice_created_idx')
+
+    def test_reports_period(self):
+        invoices = Invoice.for_period(3, 2026).order_by('-issue_date')
+        self.assertUsesIndex(invoices, 'invoice_issue_date_idx')
+        self.assertIn('issue_date>? AND issue_date<?', invoices.explain())
+
+    def test_rollup_refresh(self):
+        # refresh_month() aggregates over the same range, unordered
+        self.assertUsesIndex(Invoice.for_period(12, 2025).order_by(), 'invoice_issue_date_idx')
+
+    def test_export_by_status(self):
+        invoices = Invoice.for_period(3, 2026).filter(payment_status='paid').order_by('issue_date')
+        self.assertUsesIndex(invoices, 'invoice_status_date_idx')
+
+    def test_gallery_page(self):
+        brides = Bride.with_images(prefetch=False).order_by('-event_date', '-created_at', '-id')[:13]
+        self.assertUsesIndex(brides, 'bride_gallery_idx')
+
+    def test_bride_images(self):
+        images = BrideImage.objects.filter(bride_id=1).order_by('order', 'created_at')
+        self.assertUsesIndex(images, 'brideimage_order_idx')
+
+
+class PeriodFilterTests(TestCase):
+
+    def test_range_filters_match_calendar_periods(self):
+        customer = Customer.objects.create(name='Test')
+        for issue_date in [date(2025, 12, 31), date(2026, 1, 1), date(2026, 12, 31), date(2027, 1, 1)]:
+            Invoice.objects.create(customer=customer, issue_date=issue_date, due_date=issue_date)
+
+        self.assertEqual(Invoice.for_period(year=2026).count(), 2)
+        self.assertEqual(Invoice.for_period(12, 2025).count(), 1)
+        self.assertEqual(Invoice.for_period(12).count(), 2)
+        self.assertEqual(MonthlyRevenueRollup.refresh_month(2026, 12).bookings, 1)
+
+
+class InvoicePdfCacheTests(TestCase):
+
+    def setUp(self):
+        pdf_root = tempfile.TemporaryDirectory()
+        self.addCleanup(pdf_root.cleanup)
+        self.enterContext(override_settings(INVOICE_PDF_ROOT=pdf_root.name))
+
+    def test_customer_edit_renders_new_pdf(self):
+        customer = Customer.objects.create(name='Old Name', phone='9000000001')
+        invoice = Invoice.objects.create(customer=customer, issue_date=date(2026, 3, 1), due_date=date(2026, 3, 1))
+        etag = pdf_etag(invoice)
+        first, _ = render_invoice(invoice.pk)
+        self.assertEqual(render_invoice(invoice.pk)[0], first)
+
+        customer.name = 'New Name'
+        customer.save()
+        invoice.refresh_from_db()
+
+        second, _ = render_invoice(invoice.pk)
+        self.assertNotEqual(second, first)
+        self.assertNotEqual(pdf_etag(invoice), etag)
+        self.assertFalse(Path(first).exists())
+        self.assertTrue(Path(second).exists())
+
+
+class InvoiceTotalsTests(TestCase):
+    """Stored invoice totals follow the line items, percentages and advance"""
+
+    def setUp(self):
+        customer = Customer.objects.create(name='Test')
+        self.invoice = Invoice.objects.create(customer=customer, issue_date=date(2026, 3, 1), due_date=date(2026, 3, 1))
+
+    def assertTotals(self, subtotal, discount, tax, total, due):
+        self.invoice.refresh_from_db()
+        self.assertEqual(
+            [self.invoice.subtotal, self.invoice.discount_amount, self.invoice.tax_amount, self.invoice.total, self.invoice.due_amount],
+            [Decimal(subtotal), Decimal(discount), Decimal(tax), Decimal(total), Decimal(due)],
+        )
+
+    def test_adding_item(self):
+        InvoiceItem.objects.create(invoice=self.invoice, description='Makeup', quantity=2, unit_price=Decimal('1500'))
+        InvoiceItem.objects.create(invoice=self.invoice, description='Hair', quantity=1, unit_price=Decimal('500'))
+        self.assertTotals('3500.00', '0.00', '0.00', '3500.00', '3500.00')
+
+    def test_editing_item(self):
+        item = InvoiceItem.objects.create(invoice=self.invoice, description='Makeup', quantity=1, unit_price=Decimal('1500'))
+        item.quantity = 3
+        item.save()
+        self.assertTotals('4500.00', '0.00', '0.00', '4500.00', '4500.00')
+
+    def test_deleting_item(self):
+        InvoiceItem.objects.create(invoice=self.invoice, description='Makeup', quantity=1, unit_price=Decimal('1500'))
+        item = InvoiceItem.objects.create(invoice=self.invoice, description='Hair', quantity=1, unit_price=Decimal('500'))
+        item.delete()
+        self.assertTotals('1500.00', '0.00', '0.00', '1500.00', '1500.00')
+
+    def test_changing_percentages_and_advance(self):
+        InvoiceItem.objects.create(invoice=self.invoice, description='Makeup', quantity=1, unit_price=Decimal('1000'))
+        self.invoice.refresh_from_db()
+        self.invoice.discount_percentage = Decimal('10')
+        self.invoice.tax_percentage = Decimal('18')
+        self.invoice.advance_amount = Decimal('200')
+        self.invoice.save()
+        # Discount comes off before tax
+        self.assertTotals('1000.00', '100.00', '162.00', '1062.00', '862.00')
+
+    def test_saving_stale_invoice(self):
+        stale = Invoice.objects.get(pk=self.invoice.pk)
+        InvoiceItem.objects.create(invoice=self.invoice, description='Makeup', quantity=1, unit_price=Decimal('2000'))
+        # The in-memory copy predates the item; saving it must not restore zero totals
+        stale.notes = 'Edited'
+        stale.save()
+        self.assertTotals('2000.00', '0.00', '0.00', '2000.00', '2000.00')
+
+    def test_rounding_half_up(self):
+        self.invoice.tax_percentage = Decimal('25')
+        self.invoice.save()
+        InvoiceItem.objects.create(invoice=self.invoice, description='Pins', quantity=1, unit_price=Decimal('0.10'))
+        # 0.025 and 0.125 round up, where banker's rounding would go down
+        self.assertTotals('0.10', '0.00', '0.03', '0.13', '0.13')
+
+    def test_formset_save_recomputes_once(self):
+        self.client.force_login(User.objects.create_user('staff', password='x', is_staff=True))
+        data = {
+            'customer': self.invoice.customer_id, 'issue_date': '2026-03-01', 'due_date': '2026-03-01',
+            'payment_status': 'pending', 'discount_percentage': '0', 'tax_percentage': '0', 'advance_amount': '0',
+            'items-TOTAL_FORMS': '3', 'items-INITIAL_FORMS': '0',
+        }
+        for i, price in enumerate(['100', '200', '300']):
+            data.update({f'items-{i}-description': f'Item {i}', f'items-{i}-quantity': '1', f'items-{i}-unit_price': price})
+
+        with mock.patch.object(Invoice, 'update_totals', autospec=True, side_effect=Invoice.update_totals) as update_totals:
+            response = self.client.post(reverse('BridesOfSaima:invoice_edit', args=[self.invoice.pk]), data)
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(update_totals.call_count, 1)
+        self.assertTotals('600.00', '0.00', '0.00', '600.00', '600.00')
+
+    def test_cascade_delete_skips_recompute(self):
+        InvoiceItem.objects.create(invoice=self.invoice, description='Makeup', quantity=1, unit_price=Decimal('1500'))
+        with mock.patch.object(Invoice, 'update_totals') as update_totals:
+            self.invoice.customer.delete()
+        update_totals.assert_not_called()
+        self.assertFalse(InvoiceItem.objects.exists())
+
+
+class InvoiceSequenceTests(TestCase):
+
+    def setUp(self):
+        self.customer = Customer.objects.create(name='Test')
+
+    def create_invoice(self, issue_date, invoice_number=''):
+        return Invoice.objects.create(
+            customer=self.customer, issue_date=issue_date, due_date=issue_date, invoice_number=invoice_number
+        )
+
+    def test_first_allocation_creates_counter(self):
+        self.assertEqual(InvoiceSequence.allocate(2026), [1])
+        self.assertEqual(InvoiceSequence.objects.get(year=2026).last_number, 1)
+
+    def test_later_allocations_increment(self):
+        InvoiceSequence.allocate(2026)
+        self.assertEqual(InvoiceSequence.allocate(2026), [2])
+        self.assertEqual(InvoiceSequence.allocate(2026, 3), [3, 4, 5])
+        self.assertEqual(self.create_invoice(date(2026, 5, 1)).invoice_number, 'INV-2026-000006')
+
+    def test_new_year_starts_at_one(self):
+        self.create_invoice(date(2026, 12, 31))
+        self.assertEqual(self.create_invoice(date(2027, 1, 1)).invoice_number, 'INV-2027-000001')
+        self.assertEqual(InvoiceSequence.objects.get(year=2026).last_number, 1)
+
+    def test_migration_seeds_from_existing_numbers(self):
+        self.create_invoice(date(2025, 2, 1), 'INV-2025-000007')
+        self.create_invoice(date(2025, 3, 1), 'INV-2025-000012')
+        self.create_invoice(date(2024, 3, 1), 'INV-2024-000003')
+        self.create_invoice(date(2024, 4, 1), 'INV-8F3A21')  # Older random format
+        InvoiceSequence.objects.all().delete()
+
+        migration = import_module('BridesOfSaima.migrations.0012_invoicesequence')
+        migration.seed_sequences(apps, connection.schema_editor())
+
+        self.assertEqual(dict(InvoiceSequence.objects.values_list('year', 'last_number')), {2024: 3, 2025: 12})
+        self.assertEqual(self.create_invoice(date(2025, 6, 1)).invoice_number, 'INV-2025-000013')
+
+    def test_import_advances_sequence(self):
+        InvoiceSequence.allocate(2024)
+        csv_file = io.StringIO(
+            'name,phone,invoice_number,issue_date,due_date,description,quantity,unit_price\n'
+            'Priya,9000000001,INV-2024-000050,2024-01-02,2024-01-02,Makeup,1,5000\n'
+        )
+        result = import_bookings(csv_file)
+
+        self.assertEqual(result['errors'], [])
+        self.assertEqual(self.create_invoice(date(2024, 6, 1)).invoice_number, 'INV-2024-000051')
+
+
+class InvoiceSequenceConcurrencyTests(TransactionTestCase):
+
+    def test_concurrent_allocations_are_unique(self):
+        numbers = []
+        errors = []
+
+        def allocate():
+            try:
+                allocated = 0
+                while allocated < 10:
+                    try:
+                        numbers.extend(InvoiceSequence.allocate(2026))
+                        allocated += 1
+                    except OperationalError as e:
+                        # The shared in-memory SQLite test database reports
+                        # "locked" instead of waiting; the transaction rolled back
+                        if 'locked' not in str(e):
+                            raise
+                        time.sleep(0.001)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=allocate) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(numbers), list(range(1, 41)))
+
+
+class MonthlyRollupTests(TestCase):
+    """The monthly revenue rollups follow invoice and item changes"""
+
+    def setUp(self):
+        self.customer = Customer.objects.create(name='Test')
+
+    def create_invoice(self, issue_date, amount, **fields):
+        invoice = Invoice.objects.create(customer=self.customer, issue_date=issue_date, due_date=issue_date, **fields)
+        InvoiceItem.objects.create(invoice=invoice, description='Makeup', quantity=1, unit_price=Decimal(amount))
+        invoice.refresh_from_db()
+        return invoice
+
+    def rollup(self, year, month):
+        """(bookings, revenue, due, paid count) of a month, or None without a rollup row"""
+        return (MonthlyRevenueRollup.objects.filter(year=year, month=month)
+                .values_list('bookings', 'revenue', 'due', 'paid_count').first())
+
+    def test_creating_invoice(self):
+        self.create_invoice(date(2026, 3, 5), '1000')
+        self.create_invoice(date(2026, 3, 20), '500', advance_amount=Decimal('200'))
+        self.assertEqual(self.rollup(2026, 3), (2, Decimal('1500.00'), Decimal('1300.00'), 0))
+
+    def test_editing_invoice(self):
+        invoice = self.create_invoice(date(2026, 3, 5), '1000')
+        invoice.payment_status = 'paid'
+        invoice.advance_amount = Decimal('1000')
+        invoice.save()
+        self.assertEqual(self.rollup(2026, 3), (1, Decimal('1000.00'), Decimal('0.00'), 1))
+
+    def test_deleting_invoice(self):
+        invoice = self.create_invoice(date(2026, 3, 5), '1000')
+        self.create_invoice(date(2026, 3, 6), '700')
+        invoice.delete()
+        self.assertEqual(self.rollup(2026, 3), (1, Decimal('700.00'), Decimal('700.00'), 0))
+        Invoice.objects.get().delete()
+        self.assertIsNone(self.rollup(2026, 3))
+
+    def test_deleting_item(self):
+        invoice = self.create_invoice(date(2026, 3, 5), '1000')
+        InvoiceItem.objects.create(invoice=invoice, description='Hair', quantity=1, unit_price=Decimal('300'))
+        self.assertEqual(self.rollup(2026, 3)[1], Decimal('1300.00'))
+        invoice.items.get(description='Hair').delete()
+        self.assertEqual(self.rollup(2026, 3), (1, Decimal('1000.00'), Decimal('1000.00'), 0))
+
+    def test_moving_invoice_to_another_month(self):
+        invoice = self.create_invoice(date(2026, 3, 5), '1000')
+        self.create_invoice(date(2026, 3, 6), '700')
+        invoice.issue_date = date(2026, 4, 1)
+        invoice.save()
+        self.assertEqual(self.rollup(2026, 3), (1, Decimal('700.00'), Decimal('700.00'), 0))
+        self.assertEqual(self.rollup(2026, 4), (1, Decimal('1000.00'), Decimal('1000.00'), 0))
+
+    def test_dashboard_sums_rounded_invoice_totals(self):
+        for day in (5, 6):
+            self.create_invoice(date(2026, 3, day), '0.10', tax_percentage=Decimal('25'))
+        self.client.force_login(User.objects.create_user('staff', password='x', is_staff=True))
+        response = self.client.get(reverse('BridesOfSaima:reports_dashboard'), {'month': 3, 'year': 2026})
+        # Each get_total() is 0.125, stored as 0.13: revenue is 0.26, not 0.25
+        self.assertEqual(response.context['total_revenue'], 0.26)
+        self.assertEqual(response.context['total_due'], 0.26)
+
+    def test_recalculate_command_rebuilds_rollups(self):
+        self.create_invoice(date(2026, 3, 5), '1000')
+        self.create_invoice(date(2026, 5, 5), '400')
+        # Writes that bypass save() and the signals leave both out of date
+        Invoice.objects.update(total=0, due_amount=0)
+        MonthlyRevenueRollup.objects.all().delete()
+        MonthlyRevenueRollup.objects.create(year=2025, month=1, bookings=9)
+
+        call_command('recalculate_invoice_totals', stdout=io.StringIO())
+
+        self.assertEqual(self.rollup(2026, 3), (1, Decimal('1000.00'), Decimal('1000.00'), 0))
+        self.assertEqual(self.rollup(2026, 5), (1, Decimal('400.00'), Decimal('400.00'), 0))
+        self.assertIsNone(self.rollup(2025, 1))
+
+
+class TemporaryMediaMixin:
+    """Uploads, derivatives and resized copies written to a temporary directory"""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(
+            MEDIA_ROOT=media_root.name,
+            IMAGE_RESIZE_ROOT=Path(media_root.name) / 'resized',
+            JOBS_RUN_INLINE=True,
+        ))
+
+    def photo(self, color='red'):
+        from PIL import Image
+
+        buffer = io.BytesIO()
+        Image.new('RGB', (800, 600), color).save(buffer, 'JPEG')
+        return SimpleUploadedFile('photo.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+    def create_bride(self, photo):
+        return Bride.objects.create(
+            name='Test', location='Midnapore', tagline='Test', event_date=date(2026, 3, 1), image=photo
+        )
+
+
+class SharedImageTests(TemporaryMediaMixin, TestCase):
+    """Identical photos are stored once and deleted with their last reference"""
+
+    def stored_files(self, name):
+        """The original and the JPEG derivatives of a stored image that exist on disk"""
+        names = [name] + [derivative_name(name, width) for width in (320, 640)]
+        return [name for name in names if image_storage.exists(name)]
+
+    def test_identical_photos_share_one_file(self):
+        first = self.create_bride(self.photo())
+        second = self.create_bride(self.photo())
+        extra = BrideImage.objects.create(bride=first, image=self.photo())
+
+        self.assertEqual(second.image.name, first.image.name)
+        self.assertEqual(extra.image.name, first.image.name)
+        # One original and its two JPEG derivatives for all three rows
+        self.assertEqual(len(list(Path(image_storage.location).rglob('*.jpg'))), 3)
+        self.assertEqual(len(self.stored_files(first.image.name)), 3)
+
+    def test_deleting_one_reference_keeps_file(self):
+        first = self.create_bride(self.photo())
+        second = self.create_bride(self.photo())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+
+        self.assertEqual(len(self.stored_files(second.image.name)), 3)
+
+    def test_deleting_last_reference_removes_file_and_derivatives(self):
+        first = self.create_bride(self.photo())
+        second = self.create_bride(self.photo())
+        name = first.image.name
+        get_resized(name, 300, 300)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+            second.delete()
+
+        self.assertEqual(self.stored_files(name), [])
+        self.assertFalse(cache_path(name, 300, 300).exists())
+
+    def test_replacing_image_releases_old_file_on_commit(self):
+        bride = self.create_bride(self.photo())
+        old_name = bride.image.name
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            bride.image = self.photo('blue')
+            bride.save()
+        # Still on disk until the replacement commits
+        self.assertEqual(len(self.stored_files(old_name)), 3)
+
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(bride.image.name, old_name)
+        self.assertEqual(self.stored_files(old_name), [])
+        self.assertEqual(len(self.stored_files(bride.image.name)), 3)
+
+
+class InvoicePdfExportTestsMixin:
+    """Invoices in two months with different statuses, PDFs cached in a temporary directory"""
+
+    def setUp(self):
+        pdf_root = tempfile.TemporaryDirectory()
+        self.addCleanup(pdf_root.cleanup)
+        self.enterContext(override_settings(INVOICE_PDF_ROOT=pdf_root.name))
+        customer = Customer.objects.create(name='Test')
+        self.invoices = {}
+        for key, issue_date, status in [
+            ('march_paid', date(2026, 3, 2), 'paid'),
+            ('march_pending', date(2026, 3, 20), 'pending'),
+            ('march_paid_late', date(2026, 3, 28), 'paid'),
+            ('april_paid', date(2026, 4, 1), 'paid'),
+        ]:
+            self.invoices[key] = Invoice.objects.create(
+                customer=customer, issue_date=issue_date, due_date=issue_date, payment_status=status
+            )
+
+    def archive(self, chunks):
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(chunks)))
+        for name in archive.namelist():
+            self.assertTrue(archive.read(name).startswith(b'%PDF'), name)
+        return archive
+
+    def file_names(self, *keys):
+        return [f'{self.invoices[key].invoice_number}.pdf' for key in keys]
+
+
+class InvoicePdfExportTests(InvoicePdfExportTestsMixin, TestCase):
+
+    def test_download_contains_filtered_invoices(self):
+        self.client.force_login(User.objects.create_user('staff', password='x', is_staff=True))
+        response = self.client.get(reverse('BridesOfSaima:invoice_pdf_export'), {'month': 3, 'year': 2026, 'status': 'paid'})
+
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="invoices-2026-3-paid.zip"')
+        archive = self.archive(response.streaming_content)
+        self.assertEqual(archive.namelist(), self.file_names('march_paid', 'march_paid_late'))
+
+    def test_unknown_status_is_rejected(self):
+        self.client.force_login(User.objects.create_user('staff', password='x', is_staff=True))
+        for name in ('invoice_pdf_export', 'invoice_export'):
+            response = self.client.get(reverse(f'BridesOfSaima:{name}'), {'status': 'paid"\r\nX-Injected: 1'})
+            self.assertEqual(response.status_code, 400)
+            self.assertNotIn('Content-Disposition', response)
+
+
+class InvoicePdfExportPoolTests(InvoicePdfExportTestsMixin, TransactionTestCase):
+
+    def test_worker_pool_archives_every_invoice(self):
+        # Threads stand in for the worker processes, which cannot open the
+        # in-memory test database; the windowing and archiving are the same
+        with mock.patch('BridesOfSaima.exports.ProcessPoolExecutor', ThreadPoolExecutor):
+            archive = self.archive(stream_invoice_pdfs(Invoice.for_period(3, 2026), workers=2))
+
+        # Completion order, so compare as sets
+        self.assertEqual(sorted(archive.namelist()), sorted(self.file_names('march_paid', 'march_pending', 'march_paid_late')))
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'Only SQLite connections are tuned')
+class SqliteTuningTests(TestCase):
+    """configure_sqlite runs the tuning pragmas on each new connection when enabled"""
+
+    def pragmas(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            wrapper = type(connections['default'])({**connection.settings_dict, 'NAME': str(Path(tmp) / 'tuned.sqlite3')}, alias='tuned')
+            try:
+                with wrapper.cursor() as cursor:
+                    return {
+                        name: cursor.execute(f'PRAGMA {name}').fetchone()[0]
+                        for name in ('journal_mode', 'synchronous', 'busy_timeout', 'cache_size', 'temp_store')
+                    }
+            finally:
+                wrapper.close()
+
+    @override_settings(SQLITE_TUNING=True)
+    def test_tuned_connection(self):
+        # synchronous 1 is NORMAL and temp_store 2 is MEMORY
+        self.assertEqual(self.pragmas(), {
+            'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 5000, 'cache_size': -20000, 'temp_store': 2,
+        })
+
+    @override_settings(SQLITE_TUNING=True, SQLITE_PRAGMAS={'busy_timeout': 1234})
+    def test_pragmas_setting_overrides_defaults(self):
+        pragmas = self.pragmas()
+        self.assertEqual(pragmas['busy_timeout'], 1234)
+        self.assertEqual(pragmas['journal_mode'], 'delete')
+
+    @override_settings(SQLITE_TUNING=False)
+    def test_tuning_disabled(self):
+        self.assertEqual(self.pragmas()['journal_mode'], 'delete')
+
+
+class ServeFileTests(SimpleTestCase):
+    """serve_file answers conditional and range requests and hands off to the front-end server"""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = tmp.name
+        self.path = str(Path(tmp.name) / 'photo.jpg')
+        Path(self.path).write_bytes(b'0123456789')
+
+    def serve(self, sendfile_url=None, **headers):
+        request = RequestFactory().get('/media/photo.jpg', headers=headers)
+        response = serve_file(request, self.path, sendfile_url=sendfile_url)
+        self.addCleanup(response.close)
+        return response
+
+    def content(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_whole_file(self):
+        response = self.serve()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(self.content(response), b'0123456789')
+
+    def test_not_modified(self):
+        etag = self.serve()['ETag']
+        response = self.serve(if_none_match=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_byte_range(self):
+        response = self.serve(range='bytes=2-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+        self.assertEqual(response['Content-Length'], '4')
+        self.assertEqual(self.content(response), b'2345')
+
+    def test_suffix_range(self):
+        response = self.serve(range='bytes=-3')
+        self.assertEqual(response['Content-Range'], 'bytes 7-9/10')
+        self.assertEqual(self.content(response), b'789')
+
+    def test_unsatisfiable_range(self):
+        response = self.serve(range='bytes=10-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */10')
+
+    def test_stale_if_range_sends_whole_file(self):
+        response = self.serve(range='bytes=2-5', if_range='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.content(response), b'0123456789')
+
+    @override_settings(MEDIA_SENDFILE='x-accel-redirect')
+    def test_accel_redirect(self):
+        response = self.serve(sendfile_url='/protected-media/photo.jpg')
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/photo.jpg')
+        self.assertEqual(response.content, b'')
+        self.assertIn('ETag', response)
+
+    @override_settings(MEDIA_SENDFILE='x-sendfile')
+    def test_x_sendfile(self):
+        response = self.serve(sendfile_url='/protected-media/photo.jpg')
+        self.assertEqual(response['X-Sendfile'], self.path)
+        self.assertEqual(response.content, b'')
+
+    def test_path_outside_root(self):
+        with self.assertRaises(Http404):
+            resolve_path(self.root, '../photo.jpg')
+
+
+class ResizeTests(TemporaryMediaMixin, TestCase):
+    """Only whitelisted or signed sizes of bride photos are rendered, and the cache is swept LRU-first"""
+
+    def setUp(self):
+        super().setUp()
+        self.name = self.create_bride(self.photo()).image.name
+
+    def get(self, width, height, name=None, sig=None):
+        url = f'/media/resize/{width}x{height}/{name or self.name}'
+        response = self.client.get(url, {'sig': sig} if sig else {})
+        self.addCleanup(response.close)
+        return response
+
+    def test_whitelisted_size(self):
+        from PIL import Image
+
+        response = self.get(300, 300)
+        self.assertEqual(response.status_code, 200)
+        with Image.open(io.BytesIO(b''.join(response.streaming_content))) as image:
+            self.assertEqual(image.size, (300, 300))
+
+    def test_other_sizes_need_a_valid_signature(self):
+        self.assertEqual(self.get(123, 0).status_code, 403)
+        self.assertEqual(self.get(123, 0, sig='0' * 16).status_code, 403)
+        # A signature is only valid for the size and image it was made for
+        self.assertEqual(self.get(124, 0, sig=signature(self.name, 123, 0)).status_code, 403)
+        response = self.client.get(resized_url(self.name, 123, 0))
+        self.addCleanup(response.close)
+        self.assertEqual(response.status_code, 200)
+
+    def test_oversized_signed_size_is_rejected(self):
+        self.assertEqual(self.get(MAX_EDGE + 1, 0, sig=signature(self.name, MAX_EDGE + 1, 0)).status_code, 403)
+
+    def test_only_bride_images(self):
+        image_storage.save('other.jpg', self.photo())
+        self.assertEqual(self.get(300, 300, name='other.jpg').status_code, 404)
+
+    def test_sweep_removes_least_recently_used(self):
+        root = get_resize_root() / '300x300'
+        root.mkdir(parents=True)
+        for age, filename in enumerate(['newest.jpg', 'middle.jpg', 'oldest.jpg', 'writing.tmp']):
+            path = root / filename
+            path.write_bytes(b'x' * 100)
+            os.utime(path, (time.time() - age * 60,) * 2)
+
+        self.assertEqual(sweep_cache(max_size=1000), 0)
+        # 300 bytes against a 200 byte limit: oldest first until at most 180, ignoring the file being written
+        self.assertEqual(sweep_cache(max_size=200), 2)
+        self.assertEqual(sorted(path.name for path in root.iterdir()), ['newest.jpg', 'writing.tmp'])
+
+
+class NormalizeUploadTests(SimpleTestCase):
+    """Uploads are re-encoded as upright, size- and quality-capped JPEGs keeping only the colour profile"""
+
+    def upload(self, size=(400, 200), image_format='JPEG', mode='RGB', name='photo.jpg', **options):
+        from PIL import Image
+
+        buffer = io.BytesIO()
+        Image.new(mode, size, 'red').save(buffer, image_format, **options)
+        return SimpleUploadedFile(name, buffer.getvalue())
+
+    def normalize(self, upload):
+        from PIL import Image
+
+        result = normalize_upload(upload)
+        image = Image.open(io.BytesIO(result.read()))
+        self.addCleanup(image.close)
+        return result, image
+
+    @override_settings(BRIDE_UPLOAD_MAX_EDGE=100)
+    def test_long_edge_is_capped(self):
+        _, image = self.normalize(self.upload())
+        self.assertEqual(image.size, (100, 50))
+
+    def test_orientation_applied_and_metadata_dropped(self):
+        from PIL import Image
+
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Rotated 90 degrees clockwise
+        exif[0x010F] = 'Camera'
+        _, image = self.normalize(self.upload(exif=exif.tobytes()))
+        self.assertEqual(image.size, (200, 400))
+        self.assertEqual(dict(image.getexif()), {})
+
+    @override_settings(BRIDE_UPLOAD_QUALITY=80)
+    def test_quality_is_capped(self):
+        _, image = self.normalize(self.upload(quality=95))
+        self.assertEqual(estimate_jpeg_quality(image), 80)
+
+    @override_settings(BRIDE_UPLOAD_QUALITY=80)
+    def test_lower_source_quality_is_kept(self):
+        _, image = self.normalize(self.upload(quality=50))
+        self.assertEqual(estimate_jpeg_quality(image), 50)
+
+    def test_colour_profile_preserved(self):
+        from PIL import ImageCms
+
+        profile = ImageCms.ImageCmsProfile(ImageCms.createProfile('sRGB')).tobytes()
+        _, image = self.normalize(self.upload(icc_profile=profile))
+        self.assertEqual(image.info.get('icc_profile'), profile)
+
+    def test_transparent_png_becomes_jpeg(self):
+        result, image = self.normalize(self.upload(image_format='PNG', mode='RGBA', name='logo.png'))
+        self.assertEqual(result.name, 'logo.jpg')
+        self.assertEqual((image.format, image.mode), ('JPEG', 'RGB'))
+
+
+class GalleryFeedTests(TestCase):
+    """The gallery pages through brides with an opaque keyset cursor"""
+
+    def setUp(self):
+        get_page_cache().clear()
+        self.addCleanup(get_page_cache().clear)
+        # Three brides share an event date, so created_at and id break the tie
+        for number, event_date in enumerate([date(2026, 3, 1), date(2026, 1, 1), date(2026, 3, 1), date(2026, 2, 1), date(2026, 3, 1)]):
+            Bride.objects.create(name=f'Bride {number}', location='Midnapore', tagline='Test', event_date=event_date, image='')
+        self.expected = list(Bride.objects.order_by('-event_date', '-created_at', '-id').values_list('pk', flat=True))
+
+    def test_pages_follow_gallery_order(self):
+        seen, cursor, pages = [], None, 0
+        while True:
+            brides, cursor = get_bride_page(cursor, page_size=2)
+            seen += [bride.pk for bride in brides]
+            pages += 1
+            if cursor is None:
+                break
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(pages, 3)
+
+    def test_feed_continues_after_cursor(self):
+        cursor = encode_bride_cursor(Bride.objects.get(pk=self.expected[1]))
+        response = self.client.get(reverse('BridesOfSaima:brides_feed'), {'cursor': cursor})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([bride['id'] for bride in data['brides']], self.expected[2:])
+        self.assertIsNone(data['next_cursor'])
+
+    def test_bad_cursor_is_rejected(self):
+        # Not base64, truncated, and valid JSON of the wrong shape ([1])
+        for cursor in ('not-a-cursor!', encode_bride_cursor(Bride.objects.first())[:-4], 'WzFd'):
+            response = self.client.get(reverse('BridesOfSaima:brides_feed'), {'cursor': cursor})
+            self.assertEqual(response.status_code, 400, cursor)
+            self.assertIn('error', response.json())
+
+
+class BookingImportTests(TestCase):
+    """CSV rows are validated with a fresh form each, so one row never affects the next"""
+
+    CSV = (
+        'name,phone,invoice_number,issue_date,due_date,description,quantity,unit_price\n'
+        'Priya,9000000001,INV-2024-000001,2024-01-02,2024-01-02,Makeup,1,5000\n'
+        'Priya,9000000001,INV-2024-000001,2024-01-02,2024-01-02,Hair,many,500\n'
+        'Priya,9000000001,INV-2024-000002,2024-02-02,2024-02-02,Makeup,2,4000\n'
+        'Riya,9000000002,INV-2024-000003,2024-03-02,2024-03-02,Draping,1,1500\n'
+    )
+
+    def test_invalid_row_skips_only_its_invoice(self):
+        result = import_bookings(io.StringIO(self.CSV))
+
+        self.assertEqual([line for line, _ in result['errors']], [3])
+        self.assertIn('quantity', result['errors'][0][1])
+        self.assertEqual((result['customers'], result['invoices'], result['items']), (2, 2, 2))
+        self.assertEqual(
+            dict(Invoice.objects.values_list('invoice_number', 'total')),
+            {'INV-2024-000002': Decimal('8000.00'), 'INV-2024-000003': Decimal('1500.00')},
+        )
+
+    def test_dry_run_writes_nothing(self):
+        result = import_bookings(io.StringIO(self.CSV), dry_run=True)
+        self.assertEqual((result['invoices'], result['items']), (2, 2))
+        self.assertFalse(Invoice.objects.exists())
+
+    def test_validator_builds_a_form_per_row(self):
+        validator = RowValidator(InvoiceItemForm)
+        first, _ = validator.validate({'description': 'Makeup', 'quantity': '1', 'unit_price': '100'})
+        with self.assertRaises(ValueError):
+            validator.validate({'description': 'Hair', 'quantity': 'many', 'unit_price': '100'})
+        second, data = validator.validate({'description': 'Hair', 'quantity': '2', 'unit_price': '50'})
+
+        self.assertIsNot(first, second)
+        self.assertEqual((first.description, second.description, data['quantity']), ('Makeup', 'Hair', 2))
+
+    def test_excluded_fields_leave_the_form_class_alone(self):
+        RowValidator(InvoiceForm, exclude=['customer']).validate({
+            'issue_date': '2024-01-02', 'due_date': '2024-01-02', 'payment_status': 'pending',
+            'discount_percentage': '0', 'tax_percentage': '0', 'advance_amount': '0',
+        })
+        self.assertIn('customer', InvoiceForm().fields)
@@ -6,21 +6,31 @@ app_name = 'BridesOfSaima'
 urlpatterns = [
     path('', views.homepage, name='homepage'),
     path('my-brides/', views.brides_gallery, name='brides_gallery'),
+    path('my-brides/feed/', views.brides_feed, name='brides_feed'),
     path('my-brides/<int:pk>/', views.bride_detail, name='bride_detail'),
+    path('my-brides/<int:pk>/images/', views.bride_images, name='bride_images'),
     path('my-brides/<int:pk>/edit/', views.bride_edit, name='bride_edit'),
     
     # Invoice URLs
     path('invoices/', views.invoice_list, name='invoice_list'),
     path('invoices/create/', views.invoice_create, name='invoice_create'),
+    path('invoices/export/', views.invoice_export, name='invoice_export'),
+    path('invoices/export/pdf/', views.invoice_pdf_export, name='invoice_pdf_export'),
     path('invoices/<int:pk>/', views.invoice_detail, name='invoice_detail'),
     path('invoices/<int:pk>/edit/', views.invoice_edit, name='invoice_edit'),
     path('invoices/<int:pk>/print/', views.invoice_print, name='invoice_print'),
+    path('invoices/<int:pk>/pdf/', views.invoice_pdf, name='invoice_pdf'),
     
     # Customer URLs
     path('customers/', views.customer_list, name='customer_list'),
     path('customers/create/', views.customer_create, name='customer_create'),
+    path('customers/import/', views.bookings_import, name='bookings_import'),
     path('customers/<int:pk>/edit/', views.customer_edit, name='customer_edit'),
     
     # Reports URLs
     path('reports/', views.reports_dashboard, name='reports_dashboard'),
+    path('reports/cache/', views.cache_stats, name='cache_stats'),
+    
+    # Staff search
+    path('search/', views.staff_search, name='staff_search'),
 ]
\ No newline at end of file
@@ -1,11 +1,38 @@
 from django.shortcuts import render, get_object_or_404, redirect
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, user_passes_test
+from django.contrib.staticfiles.storage import staticfiles_storage
 from django.db import transaction
-from django.http import HttpResponse
+from django.db.models import Q
+from django.core.exceptions import PermissionDenied
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
 from django.template.loader import render_to_string
-from .models import Invoice, Customer, InvoiceItem, Bride
-from .forms import InvoiceForm, InvoiceItemFormSet, CustomerForm, BrideForm
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+import base64
+import csv
+import binascii
+import io
+import json
+import logging
+import mimetypes
+import os
+import re
+from calendar import timegm
+from datetime import date, datetime
+from .models import Invoice, Customer, InvoiceItem, Bride, MonthlyRevenueRollup
+from .forms import InvoiceForm, InvoiceItemFormSet, CustomerForm, BrideForm, BookingImportForm
+from .images import GALLERY_SIZES
+from .pdf import get_invoice_pdf, pdf_etag
+from .exports import stream_invoice_csv, stream_invoice_pdfs, write_invoice_xlsx
+from .imports import import_bookings
+from .signals import deferred_invoice_totals
+from .storage import STATIC_ENCODINGS
+from . import caching, resize, search, serving
+
+logger = logging.getLogger(__name__)
 
 def is_staff_user(user):
     """Check if user is staff/admin"""
@@ -13,6 +40,7 @@ def is_staff_user(user):
 
 # Create your views here.
 
+@caching.cache_public_page(caching.homepage_key)
 def homepage(request):
     """
     Homepage view for BridesOfSaima app
@@ -42,7 +70,8 @@ def invoice_create(request):
                 formset = InvoiceItemFormSet(request.POST, instance=invoice)
                 
                 if formset.is_valid():
-                    formset.save()
+                    with deferred_invoice_totals(invoice):
+                        formset.save()
                     messages.success(request, f'Invoice {invoice.invoice_number} created successfully!')
                     return redirect('BridesOfSaima:invoice_detail', pk=invoice.pk)
                 else:
@@ -62,7 +91,7 @@ def invoice_detail(request, pk):
     """
     Display invoice details
     """
-    invoice = get_object_or_404(Invoice, pk=pk)
+    invoice = get_object_or_404(Invoice.objects.select_related('customer'), pk=pk)
     return render(request, 'BridesOfSaima/invoice_detail.html', {
         'invoice': invoice
     })
@@ -83,7 +112,8 @@ def invoice_edit(request, pk):
                 formset = InvoiceItemFormSet(request.POST, instance=invoice)
                 
                 if formset.is_valid():
-                    formset.save()
+                    with deferred_invoice_totals(invoice):
+                        formset.save()
                     messages.success(request, f'Invoice {invoice.invoice_number} updated successfully!')
                     return redirect('BridesOfSaima:invoice_detail', pk=invoice.pk)
                 else:
@@ -105,8 +135,12 @@ def customer_list(request):
     Display list of all customers (Admin only)
     """
     customers = Customer.objects.all().order_by('name')
+    query = request.GET.get('q', '').strip()
+    if query:
+        customers = customers.filter(search.match(Customer, query))
     return render(request, 'BridesOfSaima/customer_list.html', {
         'customers': customers,
+        'query': query,
         'title': 'Customer List'
     })
 
@@ -131,6 +165,34 @@ def customer_create(request):
         'title': 'Add New Customer'
     })
 
+@user_passes_test(is_staff_user, login_url='/accounts/login/')
+def bookings_import(request):
+    """
+    Import customers and invoices from an uploaded CSV file (Admin only)
+    """
+    result = None
+    if request.method == 'POST':
+        form = BookingImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            csv_file = io.TextIOWrapper(form.cleaned_data['csv_file'], encoding='utf-8-sig', newline='')
+            try:
+                result = import_bookings(csv_file, dry_run=form.cleaned_data['dry_run'])
+            except (UnicodeDecodeError, csv.Error) as e:
+                messages.error(request, f'Could not read the CSV file: {e}')
+            else:
+                verb = 'validated' if form.cleaned_data['dry_run'] else 'imported'
+                messages.success(request, f"{result['invoices']} invoice(s) with {result['items']} item(s) {verb}.")
+                if result['errors']:
+                    messages.warning(request, f"{len(result['errors'])} row(s) were skipped, see below.")
+    else:
+        form = BookingImportForm()
+    
+    return render(request, 'BridesOfSaima/bookings_import.html', {
+        'form': form,
+        'result': result,
+        'title': 'Import Bookings'
+    })
+
 @user_passes_test(is_staff_user, login_url='/accounts/login/')
 def customer_edit(request, pk):
     """
@@ -161,7 +223,7 @@ def reports_dashboard(request):
     Reports dashboard for bookings and income analysis (Admin only)
     """
     try:
-        from django.db.models import Sum, Count, Q
+        from django.db.models import Sum
         from datetime import datetime, date
         import calendar
         import json
@@ -188,91 +250,66 @@ def reports_dashboard(request):
         else:
             year = None
         
-        # Base queryset for invoices
-        invoices = Invoice.objects.all()
-        
         # Apply filters only if specified (otherwise show all data)
-        if month and year:
-            invoices = invoices.filter(
-                issue_date__year=year,
-                issue_date__month=month
-            )
-        elif year and not month:
-            invoices = invoices.filter(issue_date__year=year)
-        elif month and not year:
-            # If only month is selected, show that month for all years
-            invoices = invoices.filter(issue_date__month=month)
+        invoices = Invoice.for_period(month, year)
         
-        # Calculate statistics using invoice methods
-        total_bookings = invoices.count()
-        total_advance_result = invoices.aggregate(total=Sum('advance_amount'))
-        total_advance = float(total_advance_result['total'] or 0)
+        # Monthly rollups matching the same filters
+        rollups = MonthlyRevenueRollup.objects.all()
+        if year:
+            rollups = rollups.filter(year=year)
+        if month:
+            rollups = rollups.filter(month=month)
         
-        # Calculate total revenue and due amounts using invoice methods
-        total_revenue = 0
-        total_due = 0
-        for invoice in invoices:
-            try:
-                total_revenue += float(invoice.get_total())
-                total_due += float(invoice.get_due_amount())
-            except (TypeError, ValueError, AttributeError):
-                # Handle potential conversion errors
-                continue
+        # Headline numbers and status breakdown summed over the rollup rows.
+        # Each invoice contributes its stored total, rounded half-up to the cent,
+        # so revenue is the sum of the printed invoice totals; it can differ by
+        # sub-cent amounts per invoice from summing unrounded get_total() values
+        stats = rollups.aggregate(
+            total_bookings=Sum('bookings'),
+            total_revenue=Sum('revenue'),
+            total_advance=Sum('advance'),
+            total_due=Sum('due'),
+            paid_invoices=Sum('paid_count'),
+            pending_invoices=Sum('pending_count'),
+            partial_invoices=Sum('partially_paid_count'),
+        )
+        total_bookings = stats['total_bookings'] or 0
+        total_revenue = float(stats['total_revenue'] or 0)
+        total_advance = float(stats['total_advance'] or 0)
+        total_due = float(stats['total_due'] or 0)
         
         # Payment status breakdown
-        paid_invoices = invoices.filter(payment_status='paid').count()
-        pending_invoices = invoices.filter(payment_status='pending').count()
-        partial_invoices = invoices.filter(payment_status='partially_paid').count()
+        paid_invoices = stats['paid_invoices'] or 0
+        pending_invoices = stats['pending_invoices'] or 0
+        partial_invoices = stats['partial_invoices'] or 0
         
-        # Monthly data for chart (last 12 months) - simplified version
+        # Monthly data for chart
         monthly_data = []
         
         # If no specific year is selected, use current year for chart
         chart_year = year if year else current_date.year
         
-        # Generate data for all 12 months of the selected/current year
+        # At most 12 rollup rows for the selected/current year
+        monthly_totals = {
+            rollup.month: rollup
+            for rollup in MonthlyRevenueRollup.objects.filter(year=chart_year)
+        }
+        
         for month_num in range(1, 13):
-            try:
-                month_invoices = Invoice.objects.filter(
-                    issue_date__year=chart_year,
-                    issue_date__month=month_num
-                )
-                
-                # Calculate monthly totals
-                monthly_revenue = 0
-                monthly_advance = 0
-                for invoice in month_invoices:
-                    try:
-                        monthly_revenue += float(invoice.get_total())
-                        monthly_advance += float(invoice.advance_amount or 0)
-                    except (TypeError, ValueError, AttributeError):
-                        continue
-                
-                monthly_data.append({
-                    'month': calendar.month_name[month_num],
-                    'year': chart_year,
-                    'bookings': month_invoices.count(),
-                    'revenue': round(monthly_revenue, 2),
-                    'advance': round(monthly_advance, 2)
-                })
-                    
-            except Exception:
-                # Skip this month if there's an error
-                continue
+            rollup = monthly_totals.get(month_num)
+            monthly_data.append({
+                'month': calendar.month_name[month_num],
+                'year': chart_year,
+                'bookings': rollup.bookings if rollup else 0,
+                'revenue': round(float(rollup.revenue), 2) if rollup else 0,
+                'advance': round(float(rollup.advance), 2) if rollup else 0
+            })
         
-        # Recent invoices with calculated totals
+        # Recent invoices
         recent_invoices = invoices.select_related('customer').order_by('-issue_date')[:10]
         
-        # Add calculated fields to invoices for template
-        invoices_with_totals = []
-        for invoice in invoices.select_related('customer').order_by('-issue_date'):
-            try:
-                invoice.total_amount = float(invoice.get_total())
-                invoice.due_amount = float(invoice.get_due_amount())
-                invoices_with_totals.append(invoice)
-            except (TypeError, ValueError, AttributeError):
-                # Skip invoices with calculation errors
-                continue
+        # Stored totals are read straight off each row by the template
+        invoices_with_totals = invoices.select_related('customer').order_by('-issue_date')
         
         # Generate month/year options for filters
         years = list(range(2020, current_date.year + 2))
@@ -303,43 +340,242 @@ def reports_dashboard(request):
         
     except Exception as e:
         # Fallback error handling with debug info
-        from django.contrib import messages
-        import traceback
-        error_details = traceback.format_exc()
         messages.error(request, f'Error loading reports: {str(e)}')
-        # In development, you might want to print or log the error details
-        print(f"Reports Error: {error_details}")
+        logger.exception(f"Reports Error: {e}")
         return redirect('BridesOfSaima:homepage')
 
 def invoice_print(request, pk):
     """
     Generate printable invoice
     """
-    invoice = get_object_or_404(Invoice, pk=pk)
+    invoice = get_object_or_404(Invoice.objects.select_related('customer'), pk=pk)
     return render(request, 'BridesOfSaima/invoice_print.html', {
         'invoice': invoice
     })
 
+def invoice_pdf(request, pk):
+    """
+    Download the invoice as a PDF, rendered once per invoice version
+    """
+    invoice = get_object_or_404(Invoice.objects.select_related('customer'), pk=pk)
+    etag = pdf_etag(invoice)
+    last_modified = timegm(invoice.updated_at.utctimetuple())
+    
+    # Answers If-None-Match/If-Modified-Since with a 304 when the copy is current
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = FileResponse(
+            open(get_invoice_pdf(invoice), 'rb'),
+            content_type='application/pdf',
+            filename=f'{invoice.invoice_number}.pdf'
+        )
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+def get_int_param(request, name):
+    """Integer query parameter, or None when missing or malformed"""
+    try:
+        return int(request.GET.get(name) or '')
+    except ValueError:
+        return None
+
+def get_export_invoices(request):
+    """
+    Invoices selected by the month/year/status query parameters of the
+    exports, and the matching file name stem; raises ValueError for a
+    status that is not one of Invoice.PAYMENT_STATUS_CHOICES
+    """
+    month = get_int_param(request, 'month')
+    year = get_int_param(request, 'year')
+    status = request.GET.get('status')
+    if status and status not in dict(Invoice.PAYMENT_STATUS_CHOICES):
+        raise ValueError('Invalid payment status')
+    
+    invoices = Invoice.for_period(month, year).order_by('issue_date', 'pk')
+    if status:
+        invoices = invoices.filter(payment_status=status)
+    
+    period = '-'.join(str(part) for part in (year, month) if part) or 'all'
+    return invoices, f'invoices-{period}{"-" + status if status else ""}'
+
+@user_passes_test(is_staff_user, login_url='/accounts/login/')
+def invoice_pdf_export(request):
+    """
+    Stream a ZIP of invoice PDFs filtered like the reports dashboard (Admin only)
+    """
+    try:
+        invoices, name = get_export_invoices(request)
+    except ValueError as e:
+        return HttpResponse(str(e), status=400, content_type='text/plain')
+    response = StreamingHttpResponse(stream_invoice_pdfs(invoices), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="{name}.zip"'
+    return response
+
+@user_passes_test(is_staff_user, login_url='/accounts/login/')
+def invoice_export(request):
+    """
+    Export invoices and their line items as CSV (streamed) or XLSX (Admin only)
+    """
+    try:
+        invoices, name = get_export_invoices(request)
+    except ValueError as e:
+        return HttpResponse(str(e), status=400, content_type='text/plain')
+    
+    if request.GET.get('format') == 'xlsx':
+        return FileResponse(
+            write_invoice_xlsx(invoices),
+            as_attachment=True,
+            filename=f'{name}.xlsx',
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        )
+    
+    response = StreamingHttpResponse(stream_invoice_csv(invoices), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{name}.csv"'
+    return response
+
+GALLERY_PAGE_SIZE = 12
+
+def encode_bride_cursor(bride):
+    """Opaque keyset cursor pointing just after `bride` in gallery order"""
+    position = [bride.event_date.isoformat(), bride.created_at.isoformat(), bride.pk]
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+def decode_bride_cursor(cursor):
+    """Inverse of encode_bride_cursor; raises ValueError for a malformed cursor"""
+    try:
+        event_date, created_at, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return date.fromisoformat(event_date), datetime.fromisoformat(created_at), int(pk)
+    except (TypeError, ValueError, binascii.Error) as e:
+        raise ValueError(f'Invalid cursor: {cursor}') from e
+
+def get_bride_page(cursor=None, page_size=GALLERY_PAGE_SIZE):
+    """
+    One page of brides in gallery order (-event_date, -created_at, -id) using
+    keyset pagination, so later pages cost the same as the first.
+    Returns the brides and the cursor of the next page (None on the last page).
+    """
+    brides = Bride.with_images(prefetch=False).order_by('-event_date', '-created_at', '-id')
+    
+    if cursor:
+        event_date, created_at, pk = decode_bride_cursor(cursor)
+        brides = brides.filter(
+            Q(event_date__lt=event_date)
+            | Q(event_date=event_date, created_at__lt=created_at)
+            | Q(event_date=event_date, created_at=created_at, pk__lt=pk)
+        )
+    
+    page = list(brides[:page_size + 1])
+    next_cursor = encode_bride_cursor(page[page_size - 1]) if len(page) > page_size else None
+    return page[:page_size], next_cursor
+
+@caching.cache_public_page(caching.gallery_key)
 def brides_gallery(request):
     """
-    Display gallery of all brides
+    Display gallery of brides; further pages are loaded from brides_feed on scroll
     """
-    brides = Bride.objects.all().order_by('-event_date', '-created_at')
-    return render(request, 'BridesOfSaima/brides_gallery.html', {
+    brides, next_cursor = get_bride_page()
+    response = render(request, 'BridesOfSaima/brides_gallery.html', {
         'brides': brides,
+        'next_cursor': next_cursor,
+        'gallery_sizes': GALLERY_SIZES,
         'title': 'My Brides Gallery'
     })
+    response.bride_ids = [bride.pk for bride in brides]
+    return response
 
+@caching.cache_public_page(caching.feed_key)
+def brides_feed(request):
+    """JSON page of gallery brides after the given cursor"""
+    try:
+        brides, next_cursor = get_bride_page(request.GET.get('cursor'))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    html = render_to_string('BridesOfSaima/bride_cards.html', {
+        'brides': brides,
+        'gallery_sizes': GALLERY_SIZES,
+    }, request=request)
+    
+    response = JsonResponse({
+        'brides': [{
+            'id': bride.pk,
+            'name': bride.name,
+            'location': bride.location,
+            'event_date': bride.event_date.isoformat(),
+            'tagline': bride.tagline,
+            'image': bride.image.url if bride.image else None,
+            'total_images': bride.get_total_images_count(),
+            'images_url': reverse('BridesOfSaima:bride_images', args=[bride.pk]),
+        } for bride in brides],
+        'html': html,
+        'next_cursor': next_cursor,
+    })
+    response.bride_ids = [bride.pk for bride in brides]
+    return response
+
+@caching.cache_public_page(caching.bride_images_key)
+def bride_images(request, pk):
+    """JSON list of a bride's carousel images, fetched when the carousel is opened"""
+    bride = get_object_or_404(Bride, pk=pk)
+    response = JsonResponse({'images': bride.get_all_images()})
+    response.bride_ids = [bride.pk]
+    return response
+
+@caching.cache_public_page(caching.bride_key)
 def bride_detail(request, pk):
     """Display detailed view of a bride with carousel of all images"""
     bride = get_object_or_404(Bride, pk=pk)
     all_images = bride.get_all_images()
     
-    return render(request, 'BridesOfSaima/bride_detail.html', {
+    response = render(request, 'BridesOfSaima/bride_detail.html', {
         'bride': bride,
         'all_images': all_images,
         'total_images': len(all_images)
     })
+    response.bride_ids = [bride.pk]
+    return response
+
+@user_passes_test(is_staff_user, login_url='/accounts/login/')
+def cache_stats(request):
+    """Hit/miss counters of the public page cache"""
+    return JsonResponse({
+        'backend': settings.CACHES[caching.PAGE_CACHE]['BACKEND'],
+        'views': caching.get_stats(),
+    })
+
+@user_passes_test(is_staff_user, login_url='/accounts/login/')
+def staff_search(request):
+    """Full-text search over customers, invoices and brides, as JSON"""
+    query = request.GET.get('q', '').strip()
+    results = search.search(query) if query else {'customers': [], 'invoices': [], 'brides': []}
+    return JsonResponse({
+        'query': query,
+        'customers': [{
+            'id': customer.pk,
+            'name': customer.name,
+            'email': customer.email,
+            'phone': customer.phone,
+            'url': reverse('BridesOfSaima:customer_edit', args=[customer.pk]),
+        } for customer in results['customers']],
+        'invoices': [{
+            'id': invoice.pk,
+            'invoice_number': invoice.invoice_number,
+            'customer': invoice.customer.name,
+            'issue_date': invoice.issue_date.isoformat(),
+            'payment_status': invoice.payment_status,
+            'total': str(invoice.total),
+            'url': reverse('BridesOfSaima:invoice_detail', args=[invoice.pk]),
+        } for invoice in results['invoices']],
+        'brides': [{
+            'id': bride.pk,
+            'name': bride.name,
+            'location': bride.location,
+            'event_date': bride.event_date.isoformat(),
+            'url': reverse('BridesOfSaima:bride_detail', args=[bride.pk]),
+        } for bride in results['brides']],
+    })
 
 @user_passes_test(is_staff_user, login_url='/accounts/login/')
 def bride_edit(request, pk):
@@ -362,3 +598,76 @@ def bride_edit(request, pk):
         'bride': bride,
         'title': f'Edit {bride.name}'
     })
+
+ONE_YEAR = 365 * 24 * 60 * 60
+
+# Seconds browsers keep uploads whose name is not a content hash
+MEDIA_MAX_AGE = 24 * 60 * 60
+
+# Upload originals named after their SHA-256 (see sharded_upload_path)
+CONTENT_HASHED_NAME = re.compile(r'^[0-9a-f]{64}\.\w+$')
+
+def accepted_encodings(request):
+    """Content codings named in the Accept-Encoding header, except those refused with q=0"""
+    encodings = set()
+    for part in request.headers.get('Accept-Encoding', '').split(','):
+        coding, _, params = part.partition(';')
+        try:
+            quality = float(params.strip().removeprefix('q=')) if params.strip() else 1
+        except ValueError:
+            quality = 1
+        if quality > 0:
+            encodings.add(coding.strip().lower())
+    return encodings
+
+def static_asset(request, path):
+    """
+    Serve a collected static file, as its precompressed brotli or gzip variant
+    when the browser accepts one. Content-hashed names never change, so
+    browsers keep them for a year without revalidating.
+    """
+    full_path = serving.resolve_path(settings.STATIC_ROOT, path)
+    content_type, _ = mimetypes.guess_type(full_path)
+    
+    encoding = None
+    accepted = accepted_encodings(request)
+    for coding, suffix in STATIC_ENCODINGS.items():
+        if coding in accepted and os.path.isfile(full_path + suffix):
+            encoding, full_path = coding, full_path + suffix
+            break
+    
+    if path in getattr(staticfiles_storage, 'hashed_names', ()):
+        cache_control = {'public': True, 'max_age': ONE_YEAR, 'immutable': True}
+    else:
+        cache_control = {'public': True, 'no_cache': True}
+    response = serving.serve_file(request, full_path, content_type, encoding, cache_control)
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
+
+def media_file(request, path):
+    """
+    Serve an uploaded file. Content-addressed uploads (see sharded_upload_path)
+    never change, so browsers keep them for a year; with settings.MEDIA_SENDFILE
+    the front-end server sends the bytes instead of a Python worker.
+    """
+    full_path = serving.resolve_path(settings.MEDIA_ROOT, path)
+    return serving.serve_file(request, full_path, cache_control=media_cache_control(path), sendfile_url=serving.sendfile_url(path))
+
+def media_cache_control(name):
+    """Cache-Control arguments for an upload, or a resized copy of it"""
+    if CONTENT_HASHED_NAME.match(os.path.basename(name)):
+        return {'public': True, 'max_age': ONE_YEAR, 'immutable': True}
+    # Legacy names and resized derivatives can be rewritten in place
+    return {'public': True, 'max_age': MEDIA_MAX_AGE}
+
+def resized_image(request, width, height, path):
+    """
+    Bride photo resized to `width` x `height`, rendered on the first request
+    and served from the resize cache afterwards (see resize.py)
+    """
+    if not resize.is_allowed(path, width, height, request.GET.get('sig', '')):
+        raise PermissionDenied
+    if not resize.is_bride_image(path):
+        raise Http404
+    full_path = resize.get_resized(path, width, height)
+    return serving.serve_file(request, full_path, cache_control=media_cache_control(path))
@@ -55,10 +55,19 @@ TEMPLATES = [
 WSGI_APPLICATION = 'BridesOfSaimaPortal.wsgi.application'
 
 # Database
+# WAL journaling, tuning pragmas (see BridesOfSaima/database.py) and
+# connections kept open across requests; set SQLITE_TUNING=0 to disable
+SQLITE_TUNING = os.environ.get('SQLITE_TUNING', '1') == '1'
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 600 if SQLITE_TUNING else 0,
+        'CONN_HEALTH_CHECKS': SQLITE_TUNING,
+        # Take the write lock when a transaction starts, so writers queue on
+        # busy_timeout instead of failing when a read turns into a write
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE'} if SQLITE_TUNING else {},
     }
 }
 
@@ -87,11 +96,94 @@ USE_TZ = True
 # Static files (CSS, JavaScript, Images)
 STATIC_URL = '/static/'
 STATIC_ROOT = '/home/yourusername/BridesOfSaimaPortal/staticfiles'
+STATIC_PRECOMPRESSED_URL = '/static-precompressed/'
+
+# collectstatic writes content-hashed names plus .br/.gz variants. The web
+# server's /static/ mapping sends the files; CSS, JavaScript and other text
+# assets are linked under STATIC_PRECOMPRESSED_URL instead, where
+# BridesOfSaima.views.static_asset serves their brotli/gzip variants
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'BridesOfSaima.storage.PrecompressedManifestStorage',
+    },
+}
+
+# collectstatic also re-encodes JPEG/PNG images (with WebP twins) and fails
+# when a file grows past its budget in bytes; first matching pattern wins
+STATIC_SIZE_BUDGETS = {
+    'BridesOfSaima/images/*': 512 * 1024,
+    'BridesOfSaima/css/*': 32 * 1024,
+}
+
+# Print the bytes saved per image during collectstatic
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'BridesOfSaima.storage': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}
 
 # Media files (User uploaded content)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = '/home/yourusername/BridesOfSaimaPortal/media'
 
+# Let the front-end server send media files: 'x-sendfile' (Apache
+# mod_xsendfile) or 'x-accel-redirect' (nginx, with an internal location at
+# MEDIA_ACCEL_REDIRECT_URL aliased to MEDIA_ROOT). Unset, Django sends them.
+MEDIA_SENDFILE = os.environ.get('MEDIA_SENDFILE') or None
+MEDIA_ACCEL_REDIRECT_URL = '/protected-media/'
+
+# Upload permissions (rw-r--r-- files, rwxr-xr-x directories)
+FILE_UPLOAD_PERMISSIONS = 0o644
+FILE_UPLOAD_DIRECTORY_PERMISSIONS = 0o755
+
+# Public page cache: file-based so every web worker sees the same entries
+# and invalidations. Set PAGE_CACHE_BACKEND=db (after createcachetable) to
+# keep it in the database instead.
+PAGE_CACHE_BACKEND = os.environ.get('PAGE_CACHE_BACKEND', 'file')
+PAGE_CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'bridesofsaima-pages',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': '/home/yourusername/BridesOfSaimaPortal/cache/pages',
+    },
+    'db': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'page_cache',
+    },
+}
+
+CACHES = {
+    # Invoice template fragments; keyed on Invoice.updated_at, so never stale
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'pages': {
+        **PAGE_CACHE_BACKENDS[PAGE_CACHE_BACKEND],
+        'TIMEOUT': 60 * 60 * 24,
+    },
+}
+
+# Cached invoice PDFs; must not be inside MEDIA_ROOT, invoices are private
+INVOICE_PDF_ROOT = '/home/yourusername/BridesOfSaimaPortal/cache/invoices'
+
+# Bride photos resized on request, with the cache size limit in bytes
+IMAGE_RESIZE_ROOT = '/home/yourusername/BridesOfSaimaPortal/cache/resized'
+IMAGE_RESIZE_CACHE_SIZE = 500 * 1024 * 1024
+
+# Keep the export_invoice_pdfs command light on shared hosting
+INVOICE_EXPORT_WORKERS = 2
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -73,10 +73,20 @@ WSGI_APPLICATION = 'BridesOfSaimaPortal.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Production SQLite profile (WAL journaling, pragmas from BridesOfSaima/database.py
+# and persistent connections). Off here: enabling it switches db.sqlite3 to WAL,
+# which adds db.sqlite3-wal and db.sqlite3-shm files next to it.
+SQLITE_TUNING = False
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 600 if SQLITE_TUNING else 0,
+        'CONN_HEALTH_CHECKS': SQLITE_TUNING,
+        # Take the write lock when a transaction starts, so writers queue on
+        # busy_timeout instead of failing when a read turns into a write
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE'} if SQLITE_TUNING else {},
     }
 }
 
@@ -124,6 +134,52 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Permissions for uploaded files and the hash-sharded directories created for them
+FILE_UPLOAD_PERMISSIONS = 0o644
+FILE_UPLOAD_DIRECTORY_PERMISSIONS = 0o755
+
+# Cache for the public pages (see BridesOfSaima/caching.py). Pick one of
+# PAGE_CACHE_BACKENDS; 'db' needs `python manage.py createcachetable` first.
+# Local memory is per process, so use 'file' or 'db' with several workers.
+PAGE_CACHE_BACKEND = 'locmem'
+PAGE_CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'bridesofsaima-pages',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'pages',
+    },
+    'db': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'page_cache',
+    },
+}
+
+CACHES = {
+    # Also holds the invoice template fragments, keyed on Invoice.updated_at
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'pages': {
+        **PAGE_CACHE_BACKENDS[PAGE_CACHE_BACKEND],
+        # Entries are invalidated on change; the timeout only bounds stale keys
+        'TIMEOUT': 60 * 60 * 24,
+    },
+}
+
+# Rendered invoice PDFs, cached per invoice version (see BridesOfSaima/pdf.py)
+INVOICE_PDF_ROOT = BASE_DIR / 'cache' / 'invoices'
+
+# Bride photos resized on request, with the cache size limit in bytes (see BridesOfSaima/resize.py)
+IMAGE_RESIZE_ROOT = BASE_DIR / 'cache' / 'resized'
+IMAGE_RESIZE_CACHE_SIZE = 500 * 1024 * 1024
+
+# Processes rendering PDFs for export_invoice_pdfs (BridesOfSaima/exports.py);
+# the staff download renders in the request's own process
+INVOICE_EXPORT_WORKERS = 4
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
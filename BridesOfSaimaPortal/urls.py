@@ -18,17 +18,21 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from BridesOfSaima.views import media_file, resized_image
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('accounts/', include('django.contrib.auth.urls')),
     path('', include('BridesOfSaima.urls')),
+    # Bride photos resized on request (see BridesOfSaima/resize.py)
+    path(f"{settings.MEDIA_URL.strip('/')}/resize/<int:width>x<int:height>/<path:path>", resized_image),
+    # Uploads, with 304s, range requests and optional X-Sendfile/X-Accel-Redirect
+    path(f"{settings.MEDIA_URL.strip('/')}/<path:path>", media_file),
 ]
 
-# Serve static and media files during development
+# Serve static files during development
 if settings.DEBUG:
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     # Also serve from app static directories
     from django.contrib.staticfiles.views import serve
     from django.views.static import serve as static_serve
@@ -36,3 +40,15 @@ if settings.DEBUG:
     urlpatterns += [
         path('static/<path:path>', serve, {'insecure': True}),
     ]
+else:
+    # Collected static files: content-hashed, precompressed and cached for a
+    # year (see BridesOfSaima.storage.PrecompressedManifestStorage). STATIC_URL
+    # only reaches Django when the web server has no mapping for it.
+    from BridesOfSaima.views import static_asset
+    urlpatterns += [
+        path(f"{settings.STATIC_URL.strip('/')}/<path:path>", static_asset),
+    ]
+    if getattr(settings, 'STATIC_PRECOMPRESSED_URL', None):
+        urlpatterns += [
+            path(f"{settings.STATIC_PRECOMPRESSED_URL.strip('/')}/<path:path>", static_asset),
+        ]